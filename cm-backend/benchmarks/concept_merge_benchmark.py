@@ -0,0 +1,96 @@
+#! /usr/bin/env python
+"""
+Benchmark of the concept merger on synthetic schemes of growing size. Every distinct concept appears twice under
+different ids, once with a varied name (case, punctuation, plural, article or a typo). Reports the duration of merging
+and the share of duplicates found (recall) and of merges that are correct (precision).
+Usage: python -m benchmarks.concept_merge_benchmark [<max_concepts>]
+"""
+import random
+import string
+import sys
+import time
+from typing import List, Tuple
+
+from merge.concept_merger import deduplicate_scheme, find_duplicates
+
+WORDS = ["neural", "network", "learning", "machine", "theory", "graph", "model", "system", "process", "language",
+         "quantum", "field", "energy", "market", "policy", "protein", "cell", "structure", "function", "data",
+         "analysis", "algorithm", "search", "memory", "signal", "control", "dynamic", "vector", "space", "group"]
+
+
+def vary(name: str, rng: random.Random) -> str:
+    """returns a variation of the name as produced by another llm call"""
+    variation = rng.randrange(5)
+
+    if variation == 0:
+        return name.upper()
+    if variation == 1:
+        return name.replace(" ", "-")
+    if variation == 2:
+        return name + "s"
+    if variation == 3:
+        return "The " + name
+
+    # typo within the longest word
+    position = rng.randrange(1, len(name) - 1)
+    return name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:]
+
+
+def create_names(num_concepts: int, seed: int = 0) -> Tuple[List[str], List[int]]:
+    """returns num_concepts names (pairs of a name and its variation) and the index of the original of every name"""
+    rng = random.Random(seed)
+    names, originals = [], []
+    used = set()
+
+    while len(names) < num_concepts:
+        name = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(2, 4))) + f" {rng.choice(WORDS)[:3]}" \
+               f"{''.join(rng.choice(string.ascii_lowercase) for _ in range(4))}"
+
+        if name in used:
+            continue
+
+        used.add(name)
+        originals.extend([len(names), len(names)])
+        names.extend([name, vary(name, rng)])
+
+    return names[:num_concepts], originals[:num_concepts]
+
+
+def create_scheme(names: List[str]) -> dict:
+    """returns a scheme of the names, every concept is related to the previous one"""
+    scheme = {"concepts": [], "relations": []}
+
+    for i, name in enumerate(names):
+        if i:
+            scheme["relations"].append({"from_concept": f"c{i - 1}", "to_concept": f"c{i}", "predicate": "relates to",
+                                        "properties": {}})
+
+        scheme["concepts"].append({"concept_id": f"c{i}", "type": "concept", "properties": {"name": name}})
+
+    return scheme
+
+
+if __name__ == '__main__':
+    max_concepts = int(sys.argv[1]) if len(sys.argv) == 2 else 80_000
+
+    print(f"{'concepts':>10} {'merged':>8} {'seconds':>8} {'recall':>8} {'precision':>10}")
+
+    num_concepts = 5_000
+    while num_concepts <= max_concepts:
+        names, originals = create_names(num_concepts)
+        scheme = create_scheme(names)
+
+        start = time.perf_counter()
+        merged, _ = deduplicate_scheme(scheme)
+        duration = time.perf_counter() - start
+
+        representatives = find_duplicates(names)
+        found = sum(1 for i, original in enumerate(originals) if i != original and representatives[i] == original)
+        merges = sum(1 for i, representative in enumerate(representatives) if representative != i)
+        correct = sum(1 for i, representative in enumerate(representatives)
+                      if representative != i and originals[representative] == originals[i])
+
+        print(f"{num_concepts:>10} {len(merged['concepts']):>8} {duration:>8.3f} "
+              f"{found / (num_concepts // 2):>8.1%} {correct / max(1, merges):>10.1%}")
+
+        num_concepts *= 2
@@ -0,0 +1,63 @@
+#! /usr/bin/env python
+"""
+Benchmark of build_graph_from_json on synthetic schemes of growing size (the dot-source is built, but not rendered).
+The time per relation should stay roughly constant, if building the graph scales linearly.
+Usage: python -m benchmarks.graphviz_builder_benchmark [<max_relations>]
+"""
+import random
+import sys
+import time
+
+from visualize.graphviz_builder import build_graph_from_json
+
+PREDICATES = ["is part of", "causes", "relates_to", "depends on", "contains", "is a"]
+
+
+def create_scheme(num_relations: int, seed: int = 0) -> dict:
+    """creates a random scheme with num_relations relations between num_relations / 2 concepts"""
+    rng = random.Random(seed)
+    num_concepts = max(2, num_relations // 2)
+
+    concepts = [{
+        "concept_id": f"c{i}",
+        "type": "some_type",
+        "properties": {"name": f"Concept <{i}> & co_{i}", "description": f"property of concept {i}"}
+    } for i in range(num_concepts)]
+
+    relations = [{
+        "from_concept": f"c{rng.randrange(num_concepts)}",
+        "to_concept": f"c{rng.randrange(num_concepts)}",
+        "predicate": rng.choice(PREDICATES),
+        "properties": {"weight": rng.randrange(10)}
+    } for _ in range(num_relations)]
+
+    return {"concepts": concepts, "relations": relations}
+
+
+def measure(scheme: dict, repetitions: int = 3, **options) -> float:
+    """returns the best duration of building the dot-source of the scheme in seconds"""
+    durations = []
+
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        build_graph_from_json(scheme, ".svg", **options).source
+        durations.append(time.perf_counter() - start)
+
+    return min(durations)
+
+
+if __name__ == '__main__':
+    max_relations = int(sys.argv[1]) if len(sys.argv) == 2 else 40_000
+
+    print(f"{'relations':>10} {'edge props':>10} {'seconds':>10} {'us/relation':>12}")
+
+    num_relations = 1_250
+    while num_relations <= max_relations:
+        scheme = create_scheme(num_relations)
+
+        for show_edge_props in (False, True):
+            duration = measure(scheme, show_node_props=True, show_edge_props=show_edge_props)
+            print(f"{num_relations:>10} {str(show_edge_props):>10} {duration:>10.3f} "
+                  f"{duration / num_relations * 1e6:>12.1f}")
+
+        num_relations *= 2
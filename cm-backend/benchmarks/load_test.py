@@ -0,0 +1,208 @@
+#! /usr/bin/env python
+"""
+Offline load test of the backend api. Drives /api/text, /api/file-upload and /api/url with the given concurrency and
+reports throughput, latency percentiles and the mean duration of every stage of the concept map generation.
+
+By default the FastAPI application is loaded in-process with the stand-in LLM (no provider calls, answers after
+--latency seconds), so only the backend itself is measured. Websites for /api/url are served by a local http server.
+With --base-url an already running server is tested instead (start it with CM_STAND_IN_LLM=true for offline tests).
+Rendering requires the graphviz executables.
+
+Usage: python -m benchmarks.load_test [--endpoints text,file,url] [--requests 50] [--concurrency 8] [--latency 1.0]
+                                      [--repeat-inputs] [--base-url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Dict, List
+
+import httpx
+
+OPTIONS = {
+    "filename": "LoadTest",
+    "extension": ".svg",
+    "context": "default",
+    "model": "gpt-4o-mini",
+    "temperature": 0.2,
+    "num_nodes": 12,
+    "show_node_props": True,
+    "show_edge_props": False,
+    "show_labels": True
+}
+
+_stage_pattern = re.compile(r'cm_stage_duration_seconds_(sum|count)\{stage="([^"]*)",model="[^"]*"} (\S+)')
+
+
+def create_text(index: int) -> str:
+    """returns a synthetic input text, different for every index"""
+    return " ".join(f"Paragraph {index}.{i}: concept mapping relates concepts by labeled relations, which makes the "
+                    f"structure of a text visible." for i in range(20))
+
+
+class WebsiteHandler(BaseHTTPRequestHandler):
+    """serves a synthetic website for every path"""
+
+    def do_GET(self):
+        index = int(self.path.strip("/") or 0)
+        body = f"<html><head><title>Load test</title></head><body><p>{create_text(index)}</p></body></html>"
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body.encode("utf-8"))))
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_website_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WebsiteHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def send_request(client: httpx.AsyncClient, endpoint: str, index: int, website_url: str) -> httpx.Response:
+    if endpoint == "text":
+        return await client.post("/api/text", json={"payload": create_text(index), "options": OPTIONS})
+
+    if endpoint == "file":
+        return await client.post("/api/file-upload", data={"options": json.dumps(OPTIONS)},
+                                 files={"file": (f"input_{index}.txt", create_text(index).encode("utf-8"))})
+
+    return await client.post("/api/url", json={"payload": f"{website_url}/{index}", "options": OPTIONS})
+
+
+async def run_endpoint(client: httpx.AsyncClient, endpoint: str, num_requests: int, concurrency: int,
+                       website_url: str, repeat_inputs: bool, offset: int) -> Dict:
+    """sends num_requests requests to the endpoint (at most concurrency at a time) and returns the measurements"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = defaultdict(int)
+
+    async def measure(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+
+            try:
+                response = await send_request(client, endpoint, 0 if repeat_inputs else offset + i, website_url)
+                status = str(response.status_code)
+            except httpx.HTTPError as err:
+                status = type(err).__name__
+
+            if status == "200":
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(measure(i) for i in range(num_requests)))
+    duration = time.perf_counter() - start
+
+    return {
+        "requests": num_requests,
+        "errors": dict(errors),
+        "throughput_rps": len(latencies) / duration,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "p99_s": percentile(latencies, 99)
+    }
+
+
+def percentile(values: List[float], p: float) -> float:
+    """returns the p-th percentile (nearest rank) of the given values"""
+    if not values:
+        return float("nan")
+
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+
+async def get_stage_totals(client: httpx.AsyncClient) -> Dict[str, List[float]]:
+    """returns the summed durations and counts of every stage reported by the metrics endpoint"""
+    totals = defaultdict(lambda: [0.0, 0.0])
+    response = await client.get("/api/metrics")
+
+    for kind, stage, value in _stage_pattern.findall(response.text):
+        totals[stage][0 if kind == "sum" else 1] += float(value)
+
+    return totals
+
+
+async def run(args):
+    website_server = start_website_server()
+    website_url = f"http://127.0.0.1:{website_server.server_port}"
+
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        # the application is configured by environment variables, so it's imported after setting them
+        os.environ["CM_STAND_IN_LLM"] = "true"
+        os.environ["CM_STAND_IN_LATENCY_S"] = str(args.latency)
+        os.environ.setdefault("CM_OUT_DIR", tempfile.mkdtemp(prefix="cm_load_test_"))
+
+        from concept_mapper_api import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://load-test"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=None) as client:
+        stages_before = await get_stage_totals(client)
+        results = {}
+
+        for n, endpoint in enumerate(args.endpoints.split(",")):
+            results[endpoint] = await run_endpoint(client, endpoint, args.requests, args.concurrency, website_url,
+                                                   args.repeat_inputs, n * args.requests)
+
+        stages_after = await get_stage_totals(client)
+
+    website_server.shutdown()
+
+    stages = {}
+    for stage, (total, count) in stages_after.items():
+        count -= stages_before.get(stage, [0, 0])[1]
+        total -= stages_before.get(stage, [0, 0])[0]
+
+        if count:
+            stages[stage] = {"count": int(count), "mean_s": total / count}
+
+    return {"endpoints": results, "stages": stages}
+
+
+def print_report(report: Dict):
+    print(f"{'endpoint':<10} {'requests':>8} {'errors':>8} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}")
+    for endpoint, result in report["endpoints"].items():
+        print(f"{endpoint:<10} {result['requests']:>8} {sum(result['errors'].values()):>8} "
+              f"{result['throughput_rps']:>8.2f} {result['p50_s']:>8.3f} {result['p95_s']:>8.3f} "
+              f"{result['p99_s']:>8.3f}")
+
+    print(f"\n{'stage':<16} {'count':>8} {'mean s':>8}")
+    for stage, result in sorted(report["stages"].items()):
+        print(f"{stage:<16} {result['count']:>8} {result['mean_s']:>8.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline load test of the concept-mapper backend")
+    parser.add_argument("--endpoints", default="text,file,url", help="comma-separated list of text, file and url")
+    parser.add_argument("--requests", type=int, default=50, help="number of requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum number of concurrent requests")
+    parser.add_argument("--latency", type=float, default=1.0, help="latency of every stand-in llm call in seconds")
+    parser.add_argument("--repeat-inputs", action="store_true", help="send the same input in every request (cached)")
+    parser.add_argument("--base-url", help="url of a running server instead of the in-process application")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    arguments = parser.parse_args()
+
+    load_test_report = asyncio.run(run(arguments))
+
+    if arguments.json:
+        print(json.dumps(load_test_report, indent=2))
+    else:
+        print_report(load_test_report)
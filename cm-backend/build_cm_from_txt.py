@@ -2,25 +2,155 @@
 """
 Simple Console-Script that creates a Concept-Map from a given text file.
 Usage: python build_cm_from_txt.py <txt_file_path> <output_dir_path> <output_file_name>
+
+Batch-Mode: creates a Concept-Map for every text file (.txt, .md, .tex) in the given directory or matching the given
+glob-pattern. Files are processed concurrently (default: 4 at a time) while respecting the rate limit of the model.
+The results are listed in <output_dir_path>/manifest.json, files that already succeeded are skipped on re-runs.
+Usage: python build_cm_from_txt.py --batch <input_dir_or_glob> <output_dir_path> [<concurrency>]
 """
+import glob
+import hashlib
 import json
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 
 from dotenv import load_dotenv
 
 from llm.models import OpenAiLLM
+from pipeline.chunking import split_text
+from pipeline.summarize import summarize_text
+from prompts.concept_extraction import get_default_extraction_prompt
 from prompts.one_shot_prompts import get_default_prompt
-from utils import create_timestamp_str
-from visualize.graphviz_builder import build_graph_from_json
+from utils import create_timestamp_str, check_if_txt
+from visualize.renderer import render_scheme
 
 # load environment variables from .env-file in parent directory
 load_dotenv(".env")
 
+
+def build_concept_map(text: str, llm: OpenAiLLM, output_dir: str, name: str):
+    """creates the concept map of the given text and writes its scheme and rendering into the output directory"""
+    # extract concept map scheme from text
+    if len(split_text(text, llm)) == 1:
+        prompt, parser = get_default_prompt()
+        json_scheme = llm.generate(prompt, params={"input": text}, parser=parser)
+    else:
+        # large inputs don't fit into the one-shot-prompt, so they are summarized chunk-wise first
+        summary_obj = summarize_text(llm, text, "text", 32)
+
+        prompt, parser = get_default_extraction_prompt()
+        json_scheme = llm.generate(prompt, params={"input": json.dumps(summary_obj)}, parser=parser)
+
+    # make output dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    # write scheme
+    with open(f"{output_dir}/{name}_scheme.json", "w") as f:
+        f.write(json.dumps(json_scheme))
+
+    # visualize and save concept map
+    render_scheme(json_scheme, f"{output_dir}/{name}.gv")
+
+
+def find_input_files(dir_or_glob: str):
+    """returns the text files in the given directory or matching the given glob-pattern"""
+    if os.path.isdir(dir_or_glob):
+        paths = [os.path.join(dir_or_glob, name) for name in os.listdir(dir_or_glob)]
+    else:
+        paths = glob.glob(dir_or_glob, recursive=True)
+
+    return sorted(path for path in paths if os.path.isfile(path) and check_if_txt(path))
+
+
+def run_batch(dir_or_glob: str, output_root: str, concurrency: int) -> int:
+    """creates the concept maps of all matching files and returns the number of failed files"""
+    manifest_path = f"{output_root}/manifest.json"
+    manifest = {}
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+
+    manifest_lock = Lock()
+    open_ai_key = os.getenv("OPENAI_API_KEY")
+
+    def write_manifest():
+        # write to a temporary file first, so an interrupted batch never leaves a broken manifest
+        with open(manifest_path + ".tmp", "w") as f:
+            f.write(json.dumps(manifest, indent=2))
+
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def process(input_path: str):
+        name = os.path.splitext(os.path.basename(input_path))[0]
+
+        # entries are keyed by the hash of the text, unreadable files by their path
+        key, llm = input_path, None
+        entry = {"input": input_path, "started": create_timestamp_str()}
+        start = time.perf_counter()
+
+        try:
+            # files are read by the workers, so only the texts currently processed are held in memory
+            with open(input_path, "r", encoding="utf8") as f:
+                text = f.read()
+
+            key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+            with manifest_lock:
+                previous = manifest.get(key)
+
+            # skip files that already succeeded in previous runs
+            if previous and previous["status"] == "done" and os.path.isdir(previous["output_dir"]):
+                print(f"skipped: {input_path}")
+                return "skipped"
+
+            entry["output_dir"] = f"{output_root}/{name}_{key[:8]}"
+
+            # every file gets its own llm instance (sharing the client and the rate limit), to track its token usage
+            llm = OpenAiLLM(openai_api_key=open_ai_key)
+            build_concept_map(text, llm, entry["output_dir"], name)
+            entry["status"] = "done"
+        except Exception as err:
+            entry["status"] = "failed"
+            entry["error"] = str(err)
+
+        entry["duration_s"] = round(time.perf_counter() - start, 3)
+        entry["usage"] = dict(llm.usage) if llm is not None else {}
+
+        with manifest_lock:
+            # an earlier failure to read the file is resolved
+            if key != input_path:
+                manifest.pop(input_path, None)
+
+            manifest[key] = entry
+            write_manifest()
+
+        print(f"{entry['status']}: {input_path} ({entry['duration_s']}s)")
+        return entry["status"]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(process, find_input_files(dir_or_glob)))
+
+    return results.count("failed")
+
+
 if __name__ == '__main__':
+    if len(sys.argv) in (4, 5) and sys.argv[1] == "--batch":
+        # check write permissions
+        if not os.access(sys.argv[3], os.W_OK):
+            print(f"Permission denied: write {sys.argv[3]}!")
+            sys.exit(3)
+
+        num_failed = run_batch(sys.argv[2], sys.argv[3], int(sys.argv[4]) if len(sys.argv) == 5 else 4)
+        sys.exit(4 if num_failed else 0)
+
     # check if required arguments are provided
     if len(sys.argv) != 4:
-        print("Usage: python build_cm_from_txt.py <txt_file_path> <output_dir_path> <output_file_name>")
+        print("Usage: python build_cm_from_txt.py <txt_file_path> <output_dir_path> <output_file_name>\n"
+              "       python build_cm_from_txt.py --batch <input_dir_or_glob> <output_dir_path> [<concurrency>]")
         sys.exit(1)
 
     # check if provided textfile exists
@@ -40,14 +170,8 @@ if __name__ == '__main__':
     # create timestamp
     stamp = create_timestamp_str()
 
-    # provide paths
-    input_path = sys.argv[1]
-    output_dir = f"{sys.argv[2]}/{sys.argv[3]}_{stamp}"
-    output_scheme_path = f"{output_dir}/{sys.argv[3]}_scheme.json"
-    output_pdf_path = f"{output_dir}/{sys.argv[3]}.gv"
-
     # read text
-    with open(input_path, "r", encoding="utf8") as f:
+    with open(sys.argv[1], "r", encoding="utf8") as f:
         text = f.read()
 
     # initialize LLM
@@ -57,21 +181,6 @@ if __name__ == '__main__':
         openai_api_key=open_ai_key
     )
 
-    # TODO handle large inputs
-
-    # extract concept map scheme from text
-    prompt, parser = get_default_prompt()
-    json_scheme = llm.generate(prompt, params={"input": text}, parser=parser)
-
-    # make output dir
-    os.mkdir(output_dir)
-
-    # write scheme
-    with open(output_scheme_path, "w") as f:
-        f.write(json.dumps(json_scheme))
-
-    # visualize and save concept map
-    dot = build_graph_from_json(json_scheme)
-    dot.render(output_pdf_path)
+    build_concept_map(text, llm, f"{sys.argv[2]}/{sys.argv[3]}_{stamp}", sys.argv[3])
 
     sys.exit(0)
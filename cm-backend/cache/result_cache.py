@@ -0,0 +1,162 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional
+
+from metrics.prometheus_metrics import cache_lookups
+from prompts import PROMPT_VERSION
+
+_whitespace_pattern = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """normalizes unicode and whitespace of the given text, so trivially different inputs share a cache entry"""
+    return _whitespace_pattern.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def create_cache_key(text: str, model: str, temperature: float, context: str, num_nodes: int, mode: str) -> str:
+    """returns a content-address for the results of a concept map generation with the given inputs"""
+    key_obj = {
+        "text": normalize_text(text),
+        "model": model,
+        "temperature": temperature,
+        "context": context,
+        "num_nodes": num_nodes,
+        "mode": mode,
+        "prompt_version": PROMPT_VERSION
+    }
+
+    return hashlib.sha256(json.dumps(key_obj, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-layered cache for generated summary-objects and schemes. Entries are kept in an in-memory LRU and are
+    persisted to a directory, whose total size is bounded by evicting the least recently used files."""
+
+    def __init__(self, cache_dir: Optional[str], max_memory_entries: int = 256, max_disk_bytes: int = 256 * 2 ** 20):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._disk_index = None         # key -> size of the file, ordered by last access (loaded lazily)
+        self._disk_bytes = 0
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """returns a copy of the cached entry ({"summary": ..., "scheme": ...}) or None if the key is unknown"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                cache_lookups.inc(result="memory_hit")
+                return copy.deepcopy(self._memory[key])
+
+            if not self.cache_dir or key not in self._get_disk_index():
+                cache_lookups.inc(result="miss")
+                return None
+
+            index = self._get_disk_index()
+
+            try:
+                with open(self._get_path(key), "r") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                # file vanished or is corrupted, forget about it
+                self._disk_bytes -= index.pop(key)
+                cache_lookups.inc(result="miss")
+                return None
+
+            index.move_to_end(key)
+            os.utime(self._get_path(key))
+            self._put_memory(key, entry)
+            cache_lookups.inc(result="disk_hit")
+
+            return copy.deepcopy(entry)
+
+    def put(self, key: str, summary: Optional[Dict], scheme: Dict):
+        """stores the summary-object and the scheme of a generation within both layers"""
+        entry = {"summary": copy.deepcopy(summary), "scheme": copy.deepcopy(scheme)}
+
+        with self._lock:
+            self._put_memory(key, entry)
+
+            if not self.cache_dir:
+                return
+
+            index = self._get_disk_index()
+            content = json.dumps(entry)
+
+            with open(self._get_path(key), "w") as f:
+                f.write(content)
+
+            self._disk_bytes += len(content) - index.pop(key, 0)
+            index[key] = len(content)
+
+            self._evict_disk()
+
+    def _put_memory(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _get_disk_index(self) -> OrderedDict:
+        """scans the cache directory once and orders the found entries by their last access"""
+        if self._disk_index is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            entries = []
+            for dir_entry in os.scandir(self.cache_dir):
+                if dir_entry.is_file() and dir_entry.name.endswith(".json"):
+                    stat = dir_entry.stat()
+                    entries.append((stat.st_mtime, dir_entry.name[:-len(".json")], stat.st_size))
+
+            self._disk_index = OrderedDict((key, size) for _, key, size in sorted(entries))
+            self._disk_bytes = sum(self._disk_index.values())
+
+        return self._disk_index
+
+    def _evict_disk(self):
+        """removes the least recently used files until the cache directory fits into its size limit"""
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk_index) > 1:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+
+            try:
+                os.remove(self._get_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+
+_result_cache = None
+_result_cache_lock = Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """returns the process-wide result cache. It is configured by the environment variables CM_CACHE_DIR (default:
+    CM_OUT_DIR/.cache), CM_CACHE_MAX_ENTRIES (in-memory entries, default: 256) and CM_CACHE_MAX_MB (default: 256)."""
+    global _result_cache
+
+    with _result_cache_lock:
+        if _result_cache is None:
+            cache_dir = os.getenv("CM_CACHE_DIR")
+
+            if not cache_dir and os.getenv("CM_OUT_DIR"):
+                cache_dir = os.path.join(os.getenv("CM_OUT_DIR"), ".cache")
+
+            _result_cache = ResultCache(
+                cache_dir=cache_dir,
+                max_memory_entries=int(os.getenv("CM_CACHE_MAX_ENTRIES", 256)),
+                max_disk_bytes=int(float(os.getenv("CM_CACHE_MAX_MB", 256)) * 2 ** 20)
+            )
+
+    return _result_cache
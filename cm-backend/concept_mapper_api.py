@@ -2,31 +2,52 @@
 """Main-Script for hosting a FastAPI application providing the backend-api for the Concept-Mapper-Application. Start
 with command `fastapi dev concept_mapper_api.py`.
 """
+import asyncio
 import json
 import os
+import re
+import tempfile
+import time
+import uuid
+from typing import Optional, Union
 
+import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
 from openai import RateLimitError, APIStatusError
 from pydantic import BaseModel
-from pypdf import PdfReader
-
-from prompts.concept_extraction import get_default_extraction_prompt
-from prompts.summarization import get_default_summary_prompt
-from prompts.examples import get_mathematical_example
-from utils import create_timestamp_str, check_if_txt, check_model, check_extension, check_context, get_mediatype
-from llm.models import OpenAiLLM, MistralAiLLM
-from prompts.one_shot_prompts import get_mathematical_prompt
+
+from utils import (create_timestamp_str, check_if_txt, check_model, check_extension, check_context, get_mediatype,
+                   get_env_flag)
+from llm.models import BaseLLM, OpenAiLLM, MistralAiLLM
+from llm.stand_in import StandInLLM
 from evaluate.graph_evaluator import GraphEvaluator
-from visualize.graphviz_builder import build_graph_from_json
-from scrape.simple_text_scraper import scrape_visible_text
+from visualize.renderer import RenderTimeoutError, pipe_scheme, render_scheme
+from scrape.simple_text_scraper import ScrapeError, ascrape_visible_text
+from pipeline.generation import (agenerate_fused, agenerate_one_shot, agenerate_speculative, agenerate_two_stage,
+                                 check_mode, get_default_mode)
+from pipeline.incremental import aupdate_scheme, merge_summaries
+from merge.concept_merger import deduplicate_scheme
+from pipeline.executor import run_blocking, run_rendering
+from cache.result_cache import create_cache_key, get_result_cache
+from extract.pdf_text_extractor import PageLimitError, PageRangeError, extract_pdf_text
+from jobs.job_queue import Job, QueueFullError, get_job_queue
+from storage.output_store import get_output_store
+from pipeline.progress import ProgressReporter
+from metrics.prometheus_metrics import (render_metrics, http_requests_in_flight, http_request_duration, jobs_queued,
+                                        jobs_running)
 
 app = FastAPI()
 
 # load environment variables from .env-file in parent directory
 load_dotenv(".env")
 
+# the job queue is created lazily, so its gauges are evaluated on collection
+jobs_queued.set_function(lambda: get_job_queue().queued())
+jobs_running.set_function(lambda: get_job_queue().running)
+
 
 class Options(BaseModel):
     """Interface for settable options"""
@@ -39,6 +60,16 @@ class Options(BaseModel):
     show_node_props: bool
     show_edge_props: bool
     show_labels: bool
+    mode: Optional[str] = None
+
+
+class RenderOptions(BaseModel):
+    """Interface for the visualization options of a re-rendered concept map"""
+    filename: str = ""
+    extension: str = ".pdf"
+    show_node_props: bool
+    show_edge_props: bool
+    show_labels: bool
 
 
 class Payload(BaseModel):
@@ -47,167 +78,527 @@ class Payload(BaseModel):
     options: Options
 
 
+class UpdatePayload(BaseModel):
+    """Interface for JSON-Payloads updating a concept map with the edited text (or the text appended to the previous
+    text)"""
+    payload: str
+    options: Options
+    append: bool = False
+
+
+# ids of generated concept maps (hex-encoded uuid4)
+_map_id_pattern = re.compile(r"[0-9a-f]{32}")
+
+# associate context presets with keywords giving some context to the model
+context_keywords = {
+    "default": "text",
+    "scientific": "scientific text",
+    "wiki-text": "wiki text"
+}
+
+
+@app.middleware("http")
+async def measure_requests(request: Request, call_next):
+    # count in-flight requests and record their latency per route (streamed bodies are not included)
+    http_requests_in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec()
+
+        route = request.scope.get("route")
+        http_request_duration.observe(time.perf_counter() - start, route=route.path if route else "unmatched",
+                                      method=request.method, status=status)
+
+
 @app.get("/api")
 def read_root():
     return {"online": True}
 
 
+@app.get("/api/metrics")
+def get_metrics() -> Response:
+    # metrics in the Prometheus text format
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/api/text")
-async def post_text(payload: Payload) -> FileResponse:
+async def post_text(payload: Payload) -> Response:
     input_text = payload.payload
     options = payload.options
 
-    return create_concept_map(input_text, options)
+    return await acreate_concept_map(input_text, options)
 
 
 @app.post("/api/file-upload")
-async def post_file(file: UploadFile = File(...), options: str = Form(...)) -> FileResponse:
-    input_text = ""
+async def post_file(file: UploadFile = File(...), options: str = Form(...), first_page: int = Form(1),
+                    last_page: Optional[int] = Form(None)) -> Response:
+    progress = ProgressReporter()
+    input_text = await read_file_text(file.filename, await file.read(), first_page, last_page, progress)
+    options = Options(**json.loads(options))
 
-    if file.filename.endswith(".pdf"):
-        reader = PdfReader(file.file)
+    return await acreate_concept_map(input_text, options, progress)
 
-        # extract plain text from pdf
-        for page in reader.pages:
-            input_text += page.extract_text()
 
-    elif check_if_txt(file.filename):
-        # decode bytestream (file) to text
-        bytestream = file.file.read()
-        input_text = bytestream.decode("utf-8")
+@app.post("/api/url")
+async def post_url(payload: Payload):
+    # scrape text from website
+    progress = ProgressReporter()
+    input_text = await read_url_text(payload.payload, progress)
+    options = payload.options
 
-    else:
-        # throw error if file is neither a .pdf, .txt, .md, or .tex file
-        raise HTTPException(status_code=422, detail="File Extension not supported. Either provide a .pdf, .txt, "
-                                                    ".md or .tex file!")
+    return await acreate_concept_map(input_text, options, progress)
 
+
+@app.post("/api/jobs/text")
+async def post_text_job(payload: Payload):
+    return submit_job(lambda progress: acreate_concept_map(payload.payload, payload.options, progress))
+
+
+@app.post("/api/jobs/file-upload")
+async def post_file_job(file: UploadFile = File(...), options: str = Form(...), first_page: int = Form(1),
+                        last_page: Optional[int] = Form(None)):
+    # the upload is read right away, text extraction already happens within the job
+    filename = file.filename
+    bytestream = await file.read()
     options = Options(**json.loads(options))
 
-    return create_concept_map(input_text, options)
+    async def run(progress: ProgressReporter):
+        input_text = await read_file_text(filename, bytestream, first_page, last_page, progress)
+        return await acreate_concept_map(input_text, options, progress)
 
+    return submit_job(run)
 
-@app.post("/api/url")
-async def post_url(payload: Payload):
-    # scrape text from website
-    input_text = scrape_visible_text(payload.payload)
-    options = payload.options
 
-    return create_concept_map(input_text, options)
+@app.post("/api/jobs/url")
+async def post_url_job(payload: Payload):
+    async def run(progress: ProgressReporter):
+        input_text = await read_url_text(payload.payload, progress)
+        return await acreate_concept_map(input_text, payload.options, progress)
 
+    return submit_job(run)
 
-def create_concept_map(text: str, options) -> FileResponse:
-    # set fallback values for options
-    filename =    options.filename    if options.filename                   else f"CoMap"
-    extension =   options.extension   if check_extension(options.extension) else ".pdf"
-    context =     options.context     if check_context(options.context)     else "default"
-    model =       options.model       if check_model(options.model)         else "gpt-4o"
-    temperature = max(0.0, min(0.8, options.temperature))
-    num_nodes =   max(2, min(32, options.num_nodes))
-    show_node_props = options.show_node_props
-    show_edge_props = options.show_edge_props
-    show_labels = options.show_labels
 
-    # create timestamp and output paths
-    stamp = create_timestamp_str()
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    return find_job(job_id).to_dict()
 
-    cm_out_dir = os.getenv("CM_OUT_DIR")
-    output_path = f"{cm_out_dir}/{filename}_{stamp}"
-    output_gv_path = output_path + f"/{filename}.gv"
 
-    # create output directory
-    os.makedirs(output_path, exist_ok=True)
+@app.get("/api/jobs/{job_id}/events")
+async def get_job_events(job_id: str) -> StreamingResponse:
+    # stream the progress of the job as server-sent events, ending with a "done" or "failed" event
+    job = find_job(job_id)
+
+    async def stream():
+        async for entry in job.progress.subscribe():
+            if entry["event"] == "done":
+                # point the client to the final file
+                entry = {**entry, "result_url": f"/api/jobs/{job_id}/result"}
+
+            yield f"event: {entry['event']}\ndata: {json.dumps(entry)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> Response:
+    job = find_job(job_id)
+
+    if job.status == "failed":
+        raise HTTPException(status_code=job.status_code, detail=job.error)
+
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is still {job.status}!")
+
+    # responses can only be sent once (and their background tasks must only run once), so a new one is created for
+    # every request
+    result = job.result
+
+    if isinstance(result, FileResponse):
+        return FileResponse(path=result.path, filename=result.filename, media_type=result.media_type,
+                            headers={"X-Map-Id": result.headers["X-Map-Id"]})
+
+    return Response(content=result.body, media_type=result.media_type, headers={
+        "Content-Disposition": result.headers["Content-Disposition"],
+        "X-Map-Id": result.headers["X-Map-Id"]
+    })
+
+
+@app.post("/api/render/{map_id}")
+async def post_render(map_id: str, options: RenderOptions) -> FileResponse:
+    # re-render a previously generated concept map with new visualization options (without calling the llm)
+    return await render_concept_map(map_id, options)
+
+
+@app.post("/api/update/{map_id}")
+async def post_update(map_id: str, payload: UpdatePayload) -> Response:
+    # create a new concept map from a previously generated one and the edited text (only changes call the llm)
+    return await aupdate_concept_map(map_id, payload.payload, payload.options, payload.append)
+
+
+@app.post("/api/jobs/update/{map_id}")
+async def post_update_job(map_id: str, payload: UpdatePayload):
+    return submit_job(lambda progress: aupdate_concept_map(map_id, payload.payload, payload.options, payload.append,
+                                                           progress))
+
+
+async def read_file_text(filename: str, bytestream: bytes, first_page: int = 1, last_page: Optional[int] = None,
+                         progress: ProgressReporter = None) -> str:
+    """returns the plain text of the given uploaded file"""
+    progress = progress or ProgressReporter()
+
+    if filename.endswith(".pdf"):
+        # extract plain text from the selected pages of the pdf (in parallel, within the pdf process pool)
+        try:
+            with progress.stage("pdf_extraction"):
+                return await extract_pdf_text(bytestream, first_page, last_page)
+        except (PageLimitError, PageRangeError) as err:
+            raise HTTPException(status_code=422, detail=str(err))
+
+    if check_if_txt(filename):
+        # decode bytestream (file) to text
+        return bytestream.decode("utf-8")
+
+    # throw error if file is neither a .pdf, .txt, .md, or .tex file
+    raise HTTPException(status_code=422, detail="File Extension not supported. Either provide a .pdf, .txt, "
+                                                ".md or .tex file!")
+
+
+async def read_url_text(url: str, progress: ProgressReporter = None) -> str:
+    """returns the visible text of the website with the given url"""
+    progress = progress or ProgressReporter()
+
+    try:
+        with progress.stage("scraping"):
+            return await ascrape_visible_text(url)
+    except (ScrapeError, httpx.HTTPError, httpx.InvalidURL, asyncio.TimeoutError) as err:
+        raise HTTPException(status_code=422, detail=f"Could not scrape {url}: {str(err) or 'Timeout'}")
+
+
+def submit_job(run) -> dict:
+    """queues a background job and returns its status"""
+    try:
+        return get_job_queue().submit(run).to_dict()
+    except QueueFullError as err:
+        raise HTTPException(status_code=503, detail=str(err))
+
+
+def find_job(job_id: str) -> Job:
+    job = get_job_queue().get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found!")
+
+    return job
+
+
+def resolve_options(options: Options) -> Options:
+    """returns a copy of the given options, where invalid values are replaced by fallback values"""
+    return Options(
+        filename=options.filename if options.filename else "CoMap",
+        extension=options.extension if check_extension(options.extension) else ".pdf",
+        context=options.context if check_context(options.context) else "default",
+        model=options.model if check_model(options.model) else "gpt-4o",
+        temperature=max(0.0, min(0.8, options.temperature)),
+        num_nodes=max(2, min(32, options.num_nodes)),
+        show_node_props=options.show_node_props,
+        show_edge_props=options.show_edge_props,
+        show_labels=options.show_labels,
+        mode=options.mode if check_mode(options.mode) else get_default_mode()
+    )
+
+
+def init_llm(model: str, temperature: float) -> BaseLLM:
+    """initializes the LLM for the given model name"""
+    if get_env_flag("CM_STAND_IN_LLM"):
+        # offline stand-in for load tests (answers deterministically without calling a provider)
+        return StandInLLM(model_name=model, temp=temperature)
 
-    # initialize LLM
     if "mistral" in model:
         mistral_key = os.getenv("MISTRAL_API_KEY")
 
-        llm = MistralAiLLM(
+        return MistralAiLLM(
             mistral_api_key=mistral_key,
             model_name=model,
             temp=temperature
         )
 
-        # TODO handle large inputs (maybe no need for that, since Mistral models use sliding window attention)
+    open_ai_key = os.getenv("OPENAI_API_KEY")
+
+    return OpenAiLLM(
+        openai_api_key=open_ai_key,
+        model_name=model,
+        temp=temperature
+    )
+
+
+async def acreate_concept_map(text: str, options, progress: ProgressReporter = None) -> Response:
+    """creates a concept map from the given text. LLM-calls are awaited and blocking work (file io, evaluation and
+    rendering) is executed within the shared executor, so the event loop stays responsive."""
+    progress = progress or ProgressReporter()
+    settings = resolve_options(options)
+    map_id, output_path, stamp = create_map_location()
+    cache_key = create_cache_key(text, settings.model, settings.temperature, settings.context, settings.num_nodes,
+                                 settings.mode)
+    cached = await run_blocking(get_result_cache().get, cache_key)
+
+    if cached:
+        # same input and settings were already processed, skip the llm entirely
+        summary_obj, json_scheme = cached["summary"], cached["scheme"]
+        progress.emit("cache_hit")
     else:
-        open_ai_key = os.getenv("OPENAI_API_KEY")
+        llm = init_llm(settings.model, settings.temperature)
 
-        llm = OpenAiLLM(
-            openai_api_key=open_ai_key,
-            model_name=model,
-            temp=temperature
-        )
+        # extract concept map scheme from text
+        try:
+            summary_obj, json_scheme = await agenerate_scheme(llm, text, settings, progress)
+
+            # the llm occasionally lists a concept twice under different ids (e.g. from the summaries of two chunks)
+            json_scheme, id_map = await run_blocking(deduplicate_scheme, json_scheme)
+            if id_map:
+                progress.emit("deduplication", merged_concepts=len(id_map))
+        except Exception as err:
+            raise to_http_exception(err)
+
+        await run_blocking(get_result_cache().put, cache_key, summary_obj, json_scheme)
 
-        # TODO handle large inputs
+    return await finish_concept_map(summary_obj, json_scheme, options, settings, map_id, output_path, stamp, progress,
+                                    create_source(text))
 
 
-    # extract concept map scheme from text
+async def aupdate_concept_map(map_id: str, text: str, options: Options, append: bool = False,
+                              progress: ProgressReporter = None) -> Response:
+    """creates a new concept map by updating the stored concept map with the given id to the edited text (or to the
+    stored text extended by the given text). Only the changed paragraphs are processed by the llm and all concepts keep
+    their ids. The context preset of the stored concept map is used, regardless of the context of the given options."""
+    progress = progress or ProgressReporter()
+    name, json_scheme = await run_blocking(find_scheme, map_id)
+
+    # the context preset determines the prompts, so it is kept from the original map (the request only sets the
+    # generation and visualization parameters)
+    stored_options = json_scheme.get("options") or {}
+    options = options.model_copy(update={"context": stored_options.get("context", options.context)})
+    settings = resolve_options(options)
+    source = await run_blocking(get_output_store().read_json, map_id, f"{name}_source")
+
+    if source is None:
+        raise HTTPException(status_code=409, detail=f"Concept map {map_id} has no stored source text to update!")
+
+    if append:
+        text = source["text"] + "\n\n" + text
+
+    llm = init_llm(settings.model, settings.temperature)
+
     try:
-        if context == "mathematical":
-            # mathematical context preset is currently still using the one-shot-prompt-approach with a provided example
+        summary_obj, json_scheme, source = await aupdate_scheme(llm, json_scheme, source, text, settings.context,
+                                                                context_keywords.get(settings.context, "text"),
+                                                                settings.num_nodes, progress)
+    except Exception as err:
+        raise to_http_exception(err)
 
-            prompt, parser = get_mathematical_prompt()
+    summary_obj = merge_summaries(await run_blocking(get_output_store().read_json, map_id, f"{name}_summary"),
+                                  summary_obj)
+    new_map_id, output_path, stamp = create_map_location()
+    progress.emit("update", map_id=map_id, new_map_id=new_map_id)
 
-            # generate scheme of concept map directly from the input text
-            json_scheme = llm.generate(prompt, parser=parser, params={
-                "input": text,
-                "example": get_mathematical_example()
-            })
-        else:
-            # other context presets currently use summary-based concept mapping (a summary prompt and an extraction prompt)
+    return await finish_concept_map(summary_obj, json_scheme, options, settings, new_map_id, output_path, stamp,
+                                    progress, source)
 
-            context_dict = {                 # associate context presets with keywords giving some context to the model
-                "default": "text",
-                "scientific": "scientific text",
-                "wiki-text": "wiki text"
-            }
 
-            summary_prompt, summary_parser = get_default_summary_prompt()
-            extraction_prompt, extraction_parser = get_default_extraction_prompt()
+def create_source(text: str) -> dict:
+    """returns the source of a new concept map (its text and the contributions of later updates)"""
+    return {"text": text, "updates": []}
 
-            # first generate a summary-object from the input text
-            summary_obj = llm.generate(summary_prompt, parser=summary_parser, params={
-                "input": text,
-                "text_type": context_dict[context],
-                "nr_concepts": num_nodes
-            })
 
-            # save summary
-            json_summary = json.dumps(summary_obj)
+def create_map_location():
+    """returns the id, the path of the output directory (created as soon as the first artifact is saved) and the
+    timestamp of a new concept map"""
+    stamp = create_timestamp_str()
+    map_id = uuid.uuid4().hex
 
-            with open(output_path + f"/{filename}_summary.json", "w") as f:
-                f.write(json_summary)
+    return map_id, get_output_path(map_id), stamp
 
-            # then generate the scheme of the concept map from the given summary
-            json_scheme = llm.generate(extraction_prompt, parser=extraction_parser, params={
-                "input": json_summary,
-            })
 
-    except RateLimitError as err:
-        raise HTTPException(status_code=422, detail="Rate-Limit-Error: " + err.response.json()["error"]["message"])
+def get_output_path(map_id: str) -> str:
+    """returns the path of the output directory of the concept map with the given id"""
+    return get_output_store().get_path(map_id)
 
-    except APIStatusError as err:
-        raise HTTPException(status_code=err.status_code, detail=err.response.json()["error"]["message"])
 
-    except Exception as err:
-        raise HTTPException(status_code=500, detail=str(err))
+async def agenerate_scheme(llm: BaseLLM, text: str, settings: Options, progress: ProgressReporter):
+    """generates the scheme of the concept map from the given text using the generation mode of the settings. Returns
+    the intermediate summary-object (None for one-shot-prompts) and the scheme."""
+    if settings.context == "mathematical":
+        # mathematical context preset is currently still using the one-shot-prompt-approach with an embedded example
+        return await agenerate_one_shot(llm, text, settings.context, progress)
 
+    text_type = context_keywords[settings.context]
 
-    # save scheme (extended by options)
-    json_scheme["options"] = vars(options)
+    if settings.mode == "fused":
+        return await agenerate_fused(llm, text, text_type, settings.num_nodes, progress)
+
+    if settings.mode == "speculative":
+        return await agenerate_speculative(llm, text, settings.context, text_type, settings.num_nodes, progress)
+
+    # first generate a summary-object from the input text (large inputs are summarized chunk-wise), then generate the
+    # scheme of the concept map from the summary
+    return await agenerate_two_stage(llm, text, text_type, settings.num_nodes, progress)
+
+
+def save_artifacts(summary_obj, json_scheme: dict, evaluation: dict, filename: str, map_id: str,
+                   rendered: bytes = None, extension: str = None, source: dict = None):
+    """saves the summary-object (if the scheme was generated from a summary), the scheme, its evaluation, the source
+    text (required for updates) and the rendered concept map (if rendered in memory) within the output store"""
+    store = get_output_store()
+
+    if summary_obj is not None:
+        store.write_json(map_id, f"{filename}_summary", summary_obj)
+
+    store.write_json(map_id, f"{filename}_scheme", json_scheme)
+    store.write_json(map_id, f"{filename}_eval", evaluation)
+
+    if source is not None:
+        store.write_json(map_id, f"{filename}_source", source)
 
-    with open(output_path + f"/{filename}_scheme.json", "w") as f:
-        f.write(json.dumps(json_scheme))
+    if rendered is not None:
+        store.write_bytes(map_id, f"{filename}.gv{extension}", rendered)
+
+
+def to_http_exception(err: Exception) -> HTTPException:
+    """maps errors raised during the generation of a scheme to http exceptions"""
+    if isinstance(err, RateLimitError):
+        return HTTPException(status_code=422, detail="Rate-Limit-Error: " + err.response.json()["error"]["message"])
+
+    if isinstance(err, APIStatusError):
+        return HTTPException(status_code=err.status_code, detail=err.response.json()["error"]["message"])
+
+    return HTTPException(status_code=500, detail=str(err))
+
+
+async def finish_concept_map(summary_obj, json_scheme: dict, options: Options, settings: Options, map_id: str,
+                             output_path: str, stamp: str, progress: ProgressReporter,
+                             source: Optional[dict] = None) -> Response:
+    """evaluates the given scheme, renders the concept map and saves all artifacts. With in-memory rendering
+    (environment variable CM_IN_MEMORY_RENDERING) the rendered bytes are sent directly and the artifacts are saved
+    after the response has been sent (or not at all, if CM_PERSIST_ARTIFACTS is false). Rendering is executed within
+    the render executor, evaluation and file io within the shared executor."""
+    filename = settings.filename
+    extension = settings.extension
+    output_gv_path = output_path + f"/{filename}.gv"
+
+    # scheme is saved extended by options
+    json_scheme["options"] = vars(options)
 
     # evaluate graph
-    graph_evaluator = GraphEvaluator(json_scheme)
+    with progress.stage("evaluation"):
+        evaluation = await run_blocking(evaluate_scheme, json_scheme)
+
+    if get_env_flag("CM_IN_MEMORY_RENDERING"):
+        # visualize concept map without touching the disk
+        with progress.stage("rendering"):
+            rendered = await run_rendering(render, json_scheme, None, extension, settings)
+
+        background = None
+        if get_env_flag("CM_PERSIST_ARTIFACTS", default=True):
+            background = BackgroundTask(run_blocking, save_artifacts, summary_obj, json_scheme, evaluation, filename,
+                                        map_id, rendered, extension, source)
+
+        return Response(content=rendered, media_type=get_mediatype(extension), background=background, headers={
+            "Content-Disposition": f'attachment; filename="{filename}_{stamp}{extension}"',
+            "X-Map-Id": map_id
+        })
 
-    # save evaluation
-    with open(output_path + f"/{filename}_eval.json", "w") as f:
-        f.write(json.dumps(graph_evaluator.get_summary()))
+    await run_blocking(save_artifacts, summary_obj, json_scheme, evaluation, filename, map_id, source=source)
 
     # visualize and save concept map
-    dot = build_graph_from_json(json_scheme, extension, show_labels, show_node_props, show_edge_props)
-    dot.render(output_gv_path)
+    with progress.stage("rendering"):
+        await run_rendering(render, json_scheme, output_gv_path, extension, settings, map_id)
 
     return FileResponse(path=f"{output_gv_path}{extension}", filename=f"{filename}_{stamp}{extension}",
-                        media_type=get_mediatype(extension))
+                        media_type=get_mediatype(extension), headers={"X-Map-Id": map_id})
+
+
+def evaluate_scheme(json_scheme: dict) -> dict:
+    """returns the evaluation summary of the graph of the given scheme"""
+    return GraphEvaluator(json_scheme).get_summary()
+
+
+def find_scheme(map_id: str):
+    """returns the name and the stored scheme of the concept map with the given id"""
+    if not _map_id_pattern.fullmatch(map_id):
+        raise HTTPException(status_code=404, detail=f"Concept map {map_id} not found!")
+
+    store = get_output_store()
+
+    # schemes are stored compressed (maps of older versions uncompressed)
+    names = [name.split("_scheme.json")[0] for name in store.list_files(map_id)
+             if name.endswith(("_scheme.json", "_scheme.json.gz"))]
+    json_scheme = store.read_json(map_id, f"{names[0]}_scheme") if names else None
+
+    if json_scheme is None:
+        raise HTTPException(status_code=404, detail=f"Concept map {map_id} not found!")
+
+    return names[0], json_scheme
+
+
+async def render_concept_map(map_id: str, options: RenderOptions) -> FileResponse:
+    """renders the stored scheme of the concept map with the given id using the given visualization options. Renders
+    are kept in the output directory, so repeated requests for the same options are served from disk."""
+    name, json_scheme = await run_blocking(find_scheme, map_id)
+    output_path = get_output_store().get_path(map_id)
+
+    filename = options.filename if options.filename else name
+    extension = options.extension if check_extension(options.extension) else ".pdf"
+
+    # every combination of flags is kept in its own file, which is only replaced by complete renders
+    flags = "".join(str(int(flag)) for flag in (options.show_labels, options.show_node_props, options.show_edge_props))
+    output_gv_path = f"{output_path}/render_{flags}.gv"
+
+    if not os.path.exists(f"{output_gv_path}{extension}"):
+        await run_rendering(render_replacing, json_scheme, output_gv_path, extension, options, map_id)
+
+    return FileResponse(path=f"{output_gv_path}{extension}", filename=f"{filename}{extension}",
+                        media_type=get_mediatype(extension), headers={"X-Map-Id": map_id})
+
+
+def render_replacing(json_scheme: dict, output_gv_path: str, extension: str, options: RenderOptions, map_id: str):
+    """renders the concept map like render, but into unique temporary files within the same directory, which replace
+    output_gv_path and output_gv_path.<format> afterwards. Concurrent renders of the same path therefore never write
+    into the same file and the rendered file is always complete."""
+    handle, temp_gv_path = tempfile.mkstemp(suffix=".gv", prefix=os.path.basename(output_gv_path)[:-3] + "_",
+                                            dir=os.path.dirname(output_gv_path))
+    os.close(handle)
+
+    try:
+        render(json_scheme, temp_gv_path, extension, options, map_id)
+        os.replace(temp_gv_path, output_gv_path)
+        os.replace(f"{temp_gv_path}{extension}", f"{output_gv_path}{extension}")
+    finally:
+        # left over if the render failed
+        for path in (temp_gv_path, f"{temp_gv_path}{extension}"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def render(json_scheme: dict, output_gv_path: Optional[str], extension: str, options: Union[Options, RenderOptions],
+           map_id: Optional[str] = None):
+    """renders the concept map (within a separate layout process) into output_gv_path.<format> of the map with the
+    given id or, if no path is given, in memory returning the rendered bytes. A render exceeding the timeout is
+    answered with 504."""
+    try:
+        if output_gv_path is None:
+            return pipe_scheme(json_scheme, extension, options.show_labels, options.show_node_props,
+                               options.show_edge_props)
+
+        rendered_path = render_scheme(json_scheme, output_gv_path, extension, options.show_labels,
+                                      options.show_node_props, options.show_edge_props)
+    except RenderTimeoutError as err:
+        raise HTTPException(status_code=504, detail=str(err))
+
+    # add the files written by the layout engine to the index of the output store
+    get_output_store().record_file(map_id, output_gv_path)
+    get_output_store().record_file(map_id, rendered_path)
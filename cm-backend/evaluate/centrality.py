@@ -0,0 +1,175 @@
+import os
+from typing import Dict, Tuple
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, shortest_path
+
+# maximum number of matrix entries (nodes * sources) processed at once during betweenness computation
+MAX_BATCH_ENTRIES = 2 ** 22
+
+
+def get_exact_max_nodes() -> int:
+    """returns the maximum number of nodes, for which centralities are computed exactly (environment variable
+    CM_CENTRALITY_EXACT_MAX_NODES, default: 500)"""
+    return int(os.getenv("CM_CENTRALITY_EXACT_MAX_NODES") or 500)
+
+
+def get_num_samples() -> int:
+    """returns the number of pivots sampled per component for approximate centralities (environment variable
+    CM_CENTRALITY_SAMPLES, default: 128)"""
+    return int(os.getenv("CM_CENTRALITY_SAMPLES") or 128)
+
+
+class SparseGraph:
+    """Undirected version of a networkx graph as sparse adjacency matrix, including its connected components. Paths
+    are computed on the simple graph (without parallel edges and self-loops)."""
+
+    def __init__(self, graph: nx.Graph):
+        self.nodes = list(graph.nodes)
+        index = {node: i for i, node in enumerate(self.nodes)}
+        n = len(self.nodes)
+
+        sources = np.array([index[u] for u, _ in graph.edges()], dtype=np.int64)
+        targets = np.array([index[v] for _, v in graph.edges()], dtype=np.int64)
+
+        # every edge is counted in both directions, so self-loops count twice (like within networkx)
+        multi_adjacency = sp.coo_matrix((np.ones(2 * len(sources)), (np.concatenate([sources, targets]),
+                                                                     np.concatenate([targets, sources]))),
+                                        shape=(n, n)).tocsr()
+        self.degrees = np.asarray(multi_adjacency.sum(axis=1)).ravel()
+
+        adjacency = multi_adjacency.tolil()
+        adjacency.setdiag(0)
+        adjacency = adjacency.tocsr()
+        adjacency.eliminate_zeros()
+        adjacency.data[:] = 1
+        self.adjacency = adjacency
+
+        self.num_components, self.labels = connected_components(adjacency, directed=False)
+
+    def components(self):
+        """yields the node indices and the adjacency matrix of every component with more than one node"""
+        order = np.argsort(self.labels, kind="stable")
+        bounds = np.flatnonzero(np.diff(self.labels[order])) + 1
+
+        for members in np.split(order, bounds):
+            if len(members) > 1:
+                yield members, self.adjacency[members][:, members]
+
+
+def degree_centrality(graph: SparseGraph) -> Dict:
+    """returns the normalized degree centrality of each node (equal to networkx.degree_centrality)"""
+    n = len(graph.nodes)
+
+    if n <= 1:
+        return {node: 1 for node in graph.nodes}
+
+    return dict(zip(graph.nodes, (graph.degrees / (n - 1)).tolist()))
+
+
+def approximate_closeness_centrality(graph: SparseGraph, num_samples: int,
+                                     rng: np.random.Generator) -> Tuple[Dict, float]:
+    """returns the closeness centrality of each node (normalized like networkx.closeness_centrality, which scales by
+    the size of the reachable component) and the maximum estimated standard error. The average distance of a node is
+    estimated by its distances to num_samples pivots of its component, smaller components are computed exactly."""
+    n = len(graph.nodes)
+    closeness = np.zeros(n)
+    max_error = 0.0
+
+    for members, adjacency in graph.components():
+        r = len(members)
+        pivots = np.arange(r) if r <= num_samples else rng.choice(r, num_samples, replace=False)
+
+        # distances from each pivot to every node of the component (pivots x nodes)
+        distances = shortest_path(adjacency, directed=False, unweighted=True, indices=pivots)
+
+        # a pivot's distance to itself is no sample of the node's average distance
+        samples = np.full(r, len(pivots), dtype=float)
+        samples[pivots] -= 1
+
+        mean_distance = distances.sum(axis=0) / np.maximum(samples, 1)
+        scale = (r - 1) / (n - 1)
+        closeness[members] = scale / mean_distance
+
+        if len(pivots) < r:
+            # delta method: se(1 / m) = se(m) / m^2
+            std_error = distances.std(axis=0, ddof=1) / np.sqrt(samples) * scale / mean_distance ** 2
+            max_error = max(max_error, float(std_error.max()))
+
+    return dict(zip(graph.nodes, closeness.tolist())), max_error
+
+
+def approximate_betweenness_centrality(graph: SparseGraph, num_samples: int,
+                                       rng: np.random.Generator) -> Tuple[Dict, float]:
+    """returns the normalized betweenness centrality of each node (like networkx.betweenness_centrality) and the
+    maximum estimated standard error. The dependencies are accumulated from num_samples pivots per component
+    (Brandes and Pich) and extrapolated to the whole component, smaller components are computed exactly."""
+    n = len(graph.nodes)
+    betweenness = np.zeros(n)
+    max_error = 0.0
+
+    if n <= 2:
+        return dict(zip(graph.nodes, betweenness.tolist())), max_error
+
+    scale = 1 / ((n - 1) * (n - 2))
+
+    for members, adjacency in graph.components():
+        r = len(members)
+        pivots = np.arange(r) if r <= num_samples else rng.choice(r, num_samples, replace=False)
+
+        total = np.zeros(r)
+        total_squares = np.zeros(r)
+        batch_size = max(1, MAX_BATCH_ENTRIES // r)
+
+        for i in range(0, len(pivots), batch_size):
+            dependencies = _accumulate_dependencies(adjacency, pivots[i:i + batch_size])
+            total += dependencies.sum(axis=1)
+            total_squares += (dependencies ** 2).sum(axis=1)
+
+        k = len(pivots)
+        betweenness[members] = total * (r / k) * scale
+
+        if k < r:
+            variance = np.maximum(total_squares / k - (total / k) ** 2, 0) * k / (k - 1)
+            std_error = r * np.sqrt(variance / k) * scale
+            max_error = max(max_error, float(std_error.max()))
+
+    return dict(zip(graph.nodes, betweenness.tolist())), max_error
+
+
+def _accumulate_dependencies(adjacency: sp.csr_matrix, sources: np.ndarray) -> np.ndarray:
+    """returns the dependencies of every node on the given sources (nodes x sources), computed by level-synchronous
+    breadth-first searches from all sources at once"""
+    r = adjacency.shape[0]
+    columns = np.arange(len(sources))
+
+    distance = np.full((r, len(sources)), -1, dtype=np.int64)
+    distance[sources, columns] = 0
+    sigma = np.zeros((r, len(sources)))
+    sigma[sources, columns] = 1
+
+    # forward phase: count the shortest paths level by level
+    level = 0
+    while True:
+        paths = adjacency @ np.where(distance == level, sigma, 0)
+        reached = (paths > 0) & (distance < 0)
+
+        if not reached.any():
+            break
+
+        level += 1
+        distance[reached] = level
+        sigma[reached] = paths[reached]
+
+    # backward phase: accumulate the dependencies from the farthest level to the sources
+    delta = np.zeros((r, len(sources)))
+    for current in range(level, 0, -1):
+        on_level = distance == current
+        coefficients = np.where(on_level, (1 + delta) / np.where(on_level, sigma, 1), 0)
+        predecessors = distance == current - 1
+        delta += np.where(predecessors, sigma * (adjacency @ coefficients), 0)
+
+    delta[sources, columns] = 0
+    return delta
@@ -1,24 +1,32 @@
+from functools import cached_property
 from statistics import fmean
+from typing import Optional
 
 import networkx as nx
+import numpy as np
+
+from evaluate.centrality import (SparseGraph, approximate_betweenness_centrality, approximate_closeness_centrality,
+                                 degree_centrality, get_exact_max_nodes, get_num_samples)
 
 
 class GraphEvaluator:
-    """Helper-Class to provide some simple evaluation metrics for the generated graph-scheme."""
-    def __init__(self, scheme):
+    """Helper-Class to provide some simple evaluation metrics for the generated graph-scheme. The undirected graph, its
+    components, the degrees and the centralities are computed once and shared by all metrics.
+
+    Closeness and betweenness centrality are computed exactly for small graphs and approximated by sampling
+    num_samples pivots per component for large (e.g. merged) graphs. Set approximate to force either mode."""
+    def __init__(self, scheme, approximate: Optional[bool] = None, num_samples: Optional[int] = None, seed: int = 0):
         # create a directed graph that allows self-loops and parallel edges
         self.graph = nx.MultiDiGraph()
         self.missing_nodes = set()
 
-        node_ids = list(map(lambda x: x['concept_id'], scheme['concepts']))
-        edges = scheme['relations']
+        node_ids = {concept['concept_id'] for concept in scheme['concepts']}
 
-        # add proposed nodes to graph
-        for node in node_ids:
-            self.graph.add_node(node)
+        # add proposed nodes to graph (in order of appearance)
+        self.graph.add_nodes_from(concept['concept_id'] for concept in scheme['concepts'])
 
         # add proposed edges to graph if they can be matched to proposed source- and target-nodes
-        for edge in edges:
+        for edge in scheme['relations']:
             if edge["from_concept"] not in node_ids:
                 self.missing_nodes.add(edge["from_concept"])
                 continue
@@ -29,6 +37,52 @@ class GraphEvaluator:
 
             self.graph.add_edge(edge["from_concept"], edge["to_concept"])
 
+        self.approximate = approximate if approximate is not None else len(self.graph) > get_exact_max_nodes()
+        self.num_samples = num_samples or get_num_samples()
+        self.seed = seed
+
+    @cached_property
+    def _undirected_graph(self):
+        return self.graph.to_undirected()
+
+    @cached_property
+    def _components(self):
+        return list(nx.connected_components(self._undirected_graph))
+
+    @cached_property
+    def _degrees(self):
+        return list(dict(self.graph.degree()).values())
+
+    @cached_property
+    def _sparse_graph(self):
+        return SparseGraph(self._undirected_graph)
+
+    @cached_property
+    def _degree_centrality(self):
+        if self.approximate:
+            # exact as well, but without iterating over the networkx adjacency
+            return _sort_dict_by_value(degree_centrality(self._sparse_graph))
+
+        return _sort_dict_by_value(nx.degree_centrality(self._undirected_graph))
+
+    @cached_property
+    def _closeness_centrality(self):
+        if self.approximate:
+            closeness, error = approximate_closeness_centrality(self._sparse_graph, self.num_samples,
+                                                                np.random.default_rng(self.seed))
+            return _sort_dict_by_value(closeness), error
+
+        return _sort_dict_by_value(nx.closeness_centrality(self._undirected_graph)), 0.0
+
+    @cached_property
+    def _betweenness_centrality(self):
+        if self.approximate:
+            betweenness, error = approximate_betweenness_centrality(self._sparse_graph, self.num_samples,
+                                                                    np.random.default_rng(self.seed))
+            return _sort_dict_by_value(betweenness), error
+
+        return _sort_dict_by_value(nx.betweenness_centrality(self._undirected_graph)), 0.0
+
     def get_missing_nodes(self):
         """returns a list of missing nodes (nodes mentioned within relations but not within the nodes-array)"""
         return self.missing_nodes
@@ -39,50 +93,51 @@ class GraphEvaluator:
 
     def get_disconnected_components(self):
         """returns all disconnected components of the graph (subgraphs that are not connected to each other)"""
-        undirected_graph = self.graph.to_undirected()
-        return list(nx.connected_components(undirected_graph))
+        return list(self._components)
 
     def count_disconnected_components(self):
         """returns the number of disconnected components of the graph (subgraphs that are not connected to each
         other)"""
-        return len(self.get_disconnected_components())
+        return len(self._components)
 
     def get_lonely_nodes(self):
         """returns all lonely nodes (nodes without relations)"""
-        undirected_graph = self.graph.to_undirected()
-        components = nx.connected_components(undirected_graph)
-
-        return [undirected_graph.subgraph(c).copy() for c in components if len(c) == 1]
+        return [node for component in self._components if len(component) == 1 for node in component]
 
     def count_lonely_nodes(self):
         """returns the number of lonely nodes (nodes without relations)"""
-        return len(self.get_lonely_nodes())
+        return sum(1 for component in self._components if len(component) == 1)
 
     def get_normalized_degree_centrality(self):
         """returns the normalized degree centrality of each node"""
-        return _sort_dict_by_value(nx.degree_centrality(self.graph.to_undirected()))
+        return dict(self._degree_centrality)
 
     def get_closeness_centrality(self):
         """returns the closeness centrality of each node"""
-        return _sort_dict_by_value(nx.closeness_centrality(self.graph.to_undirected()))
+        return dict(self._closeness_centrality[0])
 
     def get_betweenness_centrality(self):
         """returns the betweenness centrality of each node"""
-        return _sort_dict_by_value(nx.betweenness_centrality(self.graph.to_undirected()))
+        return dict(self._betweenness_centrality[0])
+
+    def get_centrality_errors(self):
+        """returns the maximum estimated standard errors of the approximated centralities (0 if computed exactly)"""
+        return {
+            'closeness': self._closeness_centrality[1],
+            'betweenness': self._betweenness_centrality[1]
+        }
 
     def get_avg_edges(self):
         """returns the average number of edges per node"""
-        degrees = list(dict(self.graph.degree()).values())
-        return fmean(degrees)
+        return fmean(self._degrees)
 
     def get_max_edges(self):
         """returns the maximum number of edges per node"""
-        degrees = list(dict(self.graph.degree()).values())
-        return max(degrees)
+        return max(self._degrees)
 
     def get_summary(self):
         """returns a dict summarizing all metrics"""
-        return {
+        summary = {
             'missing_nodes': self.count_missing_nodes(),
             'disconnected_components': self.count_disconnected_components(),
             'lonely_nodes': self.count_lonely_nodes(),
@@ -95,6 +150,14 @@ class GraphEvaluator:
             }
         }
 
+        if self.approximate:
+            summary['centrality_approximation'] = {
+                'samples': self.num_samples,
+                'max_std_error': self.get_centrality_errors()
+            }
+
+        return summary
+
 
 def _sort_dict_by_value(dictionary):
     """Helper-function to sort a dictionary by its values (descending)"""
@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from threading import Lock
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+_pool = None
+_pool_workers = 1
+_pool_lock = Lock()
+
+
+class PageLimitError(ValueError):
+    """Raised if the selected pages of a pdf exceed the maximum page count"""
+
+
+class PageRangeError(ValueError):
+    """Raised if the selected page range of a pdf is empty or lies outside of the pdf"""
+
+
+def get_max_pages() -> int:
+    """returns the maximum number of pages extracted from a single pdf (environment variable CM_PDF_MAX_PAGES,
+    default: 1000)"""
+    return int(os.getenv("CM_PDF_MAX_PAGES") or 1000)
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """returns the shared process pool for text extraction. The number of processes is given by the environment
+    variable CM_PDF_WORKERS (default: number of cpus)."""
+    global _pool, _pool_workers
+
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = int(os.getenv("CM_PDF_WORKERS") or os.cpu_count() or 1)
+
+            # spawned workers don't inherit the threads and open connections of the server process
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    return _pool
+
+
+def _extract_pages(data: bytes, start: int, end: int) -> List[str]:
+    """extracts the text of the pages [start, end) (zero-based) of the given pdf. Runs within a worker process."""
+    reader = PdfReader(BytesIO(data))
+    return [reader.pages[i].extract_text() for i in range(start, end)]
+
+
+def _count_pages(data: bytes) -> int:
+    return len(PdfReader(BytesIO(data)).pages)
+
+
+def _select_pages(num_pages: int, first_page: int, last_page: Optional[int]) -> Tuple[int, int]:
+    """converts the selected (one-based, inclusive) page range into a zero-based range [start, end) and checks it
+    against the pdf and the maximum page count"""
+    if first_page < 1 or (last_page is not None and last_page < 1):
+        raise PageRangeError(f"Invalid page range: page numbers start at 1 (got {first_page} to {last_page})!")
+
+    if last_page is not None and last_page < first_page:
+        raise PageRangeError(f"Invalid page range: the first page ({first_page}) is after the last page "
+                             f"({last_page})!")
+
+    start = first_page - 1
+    end = min(num_pages, last_page) if last_page is not None else num_pages
+
+    # nothing would be extracted, but the empty text would still be sent to the llm
+    if end <= start:
+        raise PageRangeError(f"Invalid page range: the first page ({first_page}) is after the end of the pdf "
+                             f"({num_pages} pages)!")
+
+    if end - start > get_max_pages():
+        raise PageLimitError(f"The pdf contains too many pages ({end - start} selected, at most {get_max_pages()} "
+                             f"allowed). Select a page range!")
+
+    return start, end
+
+
+def _create_batches(start: int, end: int, num_workers: int) -> List[Tuple[int, int]]:
+    """splits the page range into batches, so that every worker gets about two of them"""
+    batch_size = max(1, -(-(end - start) // (2 * num_workers)))
+    return [(i, min(end, i + batch_size)) for i in range(start, end, batch_size)]
+
+
+async def stream_pdf_pages(data: bytes, first_page: int = 1,
+                           last_page: Optional[int] = None) -> AsyncIterator[Tuple[int, str]]:
+    """extracts the text of the selected pages of the given pdf in parallel (within the shared process pool) and
+    yields tuples of (page number, text) in page order, as soon as the respective pages are extracted."""
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+
+    num_pages = await loop.run_in_executor(pool, _count_pages, data)
+    start, end = _select_pages(num_pages, first_page, last_page)
+
+    batches = _create_batches(start, end, _pool_workers)
+    futures = [loop.run_in_executor(pool, _extract_pages, data, batch_start, batch_end)
+               for batch_start, batch_end in batches]
+
+    try:
+        for (batch_start, _), future in zip(batches, futures):
+            for offset, text in enumerate(await future):
+                yield batch_start + offset + 1, text
+    finally:
+        # the consumer stopped early (or failed), don't extract the remaining pages
+        for future in futures:
+            future.cancel()
+
+
+async def extract_pdf_text(data: bytes, first_page: int = 1, last_page: Optional[int] = None) -> str:
+    """returns the plain text of the selected pages of the given pdf"""
+    return "\n".join([text async for _, text in stream_pdf_pages(data, first_page, last_page)])
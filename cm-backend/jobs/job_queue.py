@@ -0,0 +1,169 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from pipeline.progress import ProgressReporter
+
+
+class QueueFullError(Exception):
+    """Raised if a job is submitted while the queue is full"""
+
+
+class Job:
+    """A concept map generation executed in the background. The result is whatever the job's coroutine returns, its
+    progress is reported to the job's ProgressReporter."""
+
+    def __init__(self, run: Callable[[ProgressReporter], Awaitable[Any]]):
+        self.job_id = uuid.uuid4().hex
+        self.run = run
+        self.progress = ProgressReporter()
+
+        self.status = "queued"      # queued -> running -> done | failed
+        self.result = None
+        self.error = None
+        self.status_code = None
+
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self) -> Dict:
+        """returns the status of the job (without its result)"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "status_code": self.status_code,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+
+
+class JobQueue:
+    """Bounded queue of jobs processed by a fixed number of worker tasks. Finished jobs are kept for retention_seconds,
+    so their status and result can be requested afterwards."""
+
+    def __init__(self, num_workers: int = 4, max_queued: int = 100, retention_seconds: float = 3600):
+        self.num_workers = num_workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue = None
+        self._workers = []
+        self._loop = None
+        self.running = 0
+
+    def submit(self, run: Callable[[ProgressReporter], Awaitable[Any]]) -> Job:
+        """queues a job executing the given coroutine function (called with the progress reporter of the job). Must be
+        called within the event loop."""
+        self._ensure_workers()
+        self._prune()
+
+        job = Job(run)
+
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Too many queued jobs, try again later!")
+
+        job.progress.emit("queued", job_id=job.job_id)
+
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def queued(self) -> int:
+        """returns the number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue else 0
+
+    def _ensure_workers(self):
+        """starts the workers within the running event loop (again, if the loop changed)"""
+        loop = asyncio.get_running_loop()
+
+        if self._loop is loop:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._workers = [loop.create_task(self._work()) for _ in range(self.num_workers)]
+
+    async def _work(self):
+        queue = self._queue
+
+        while True:
+            job = await queue.get()
+
+            job.status = "running"
+            job.started = time.time()
+            job.progress.emit("running", job_id=job.job_id)
+            self.running += 1
+
+            try:
+                job.result = await job.run(job.progress)
+
+                # the response of a job is never sent, so its background task (e.g. saving the artifacts) has to run
+                # before the job is done
+                background = getattr(job.result, "background", None)
+                if background is not None:
+                    job.result.background = None
+                    await background()
+
+                job.status = "done"
+            except HTTPException as err:
+                job.status = "failed"
+                job.status_code = err.status_code
+                job.error = err.detail
+            except Exception as err:
+                job.status = "failed"
+                job.status_code = 500
+                job.error = str(err)
+            finally:
+                job.finished = time.time()
+                job.run = None
+                self.running -= 1
+                queue.task_done()
+
+            # final event, the result can be fetched afterwards
+            job.progress.emit(job.status, **job.to_dict())
+            job.progress.close()
+
+    def _prune(self):
+        """forgets finished jobs exceeding the retention time (jobs are ordered by creation)"""
+        deadline = time.time() - self.retention_seconds
+
+        for job_id in list(self._jobs.keys()):
+            job = self._jobs[job_id]
+
+            if job.created >= deadline:
+                break
+
+            if job.finished and job.finished < deadline:
+                del self._jobs[job_id]
+
+
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """returns the process-wide job queue. It is configured by the environment variables CM_JOB_WORKERS (number of
+    concurrently processed jobs, default: 4), CM_JOB_QUEUE_SIZE (default: 100) and CM_JOB_RETENTION_S (default:
+    3600)."""
+    global _job_queue
+
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            num_workers=int(os.getenv("CM_JOB_WORKERS") or 4),
+            max_queued=int(os.getenv("CM_JOB_QUEUE_SIZE") or 100),
+            retention_seconds=float(os.getenv("CM_JOB_RETENTION_S") or 3600)
+        )
+
+    return _job_queue
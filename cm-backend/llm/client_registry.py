@@ -0,0 +1,77 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, Tuple
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+
+from metrics.prometheus_metrics import llm_http_responses, llm_retries
+
+# maximum number of chat models kept alive (all of them share the http connection pools below)
+MAX_CHAT_MODELS = 64
+
+_http_clients: Dict[Tuple, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_chat_models: "OrderedDict[Tuple, BaseChatModel]" = OrderedDict()
+_lock = Lock()
+
+
+def get_pool_limits() -> httpx.Limits:
+    """returns the limits of the shared connection pools, configured by the environment variable
+    CM_LLM_MAX_CONNECTIONS (default: 20 connections per pool, all of them kept alive)"""
+    max_connections = int(os.getenv("CM_LLM_MAX_CONNECTIONS", 20))
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+
+def get_http_clients(key: Tuple, **kwargs) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """returns the long-lived sync and async http clients for the given key (created with the given arguments on first
+    use). Connections, including their TLS sessions, are kept alive and reused across requests."""
+    with _lock:
+        if key not in _http_clients:
+            limits = get_pool_limits()
+            hook, async_hook = _create_response_hooks(key[0])
+
+            _http_clients[key] = (httpx.Client(limits=limits, event_hooks={"response": [hook]}, **kwargs),
+                                  httpx.AsyncClient(limits=limits, event_hooks={"response": [async_hook]}, **kwargs))
+
+        return _http_clients[key]
+
+
+def _create_response_hooks(provider: str):
+    """returns sync and async http hooks counting the responses of the given provider. The clients of the providers
+    retry rate-limited (429) and failed (5xx) requests on their own, so these responses are counted as retries."""
+    def hook(response: httpx.Response):
+        llm_http_responses.inc(provider=provider, status=response.status_code)
+
+        if response.status_code == 429 or response.status_code >= 500:
+            llm_retries.inc(provider=provider)
+
+    async def async_hook(response: httpx.Response):
+        hook(response)
+
+    return hook, async_hook
+
+
+def get_chat_model(provider: str, model_name: str, temperature: float, api_key: str,
+                   factory: Callable[[], BaseChatModel]) -> BaseChatModel:
+    """returns the shared chat model for the given provider, model, temperature and api key. The model is created by
+    the given factory on first use. Chat models don't hold any per-call state, so they can safely be shared between
+    threads and coroutines."""
+    key = (provider, model_name, temperature, api_key)
+
+    with _lock:
+        if key in _chat_models:
+            _chat_models.move_to_end(key)
+            return _chat_models[key]
+
+    chat_model = factory()
+
+    with _lock:
+        # another thread may have created the same model in the meantime, keep the first one
+        chat_model = _chat_models.setdefault(key, chat_model)
+        _chat_models.move_to_end(key)
+
+        while len(_chat_models) > MAX_CHAT_MODELS:
+            _chat_models.popitem(last=False)
+
+        return chat_model
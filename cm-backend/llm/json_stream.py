@@ -0,0 +1,180 @@
+import json
+import re
+import typing
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Type
+
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel
+
+_string_special_pattern = re.compile(r'["\\]')
+
+
+def create_item_checks(schema: Type[BaseModel]) -> Dict[str, Callable[[object], bool]]:
+    """returns a check for the elements of every list-field of the given pydantic model. Elements of model-lists must
+    be objects containing all required fields of the model (values aren't checked strictly, since models often return
+    numbers as properties), elements of other lists must be of the annotated type."""
+    checks = {}
+
+    for name, field in schema.model_fields.items():
+        if typing.get_origin(field.annotation) is not list or not typing.get_args(field.annotation):
+            continue
+
+        item_type = typing.get_args(field.annotation)[0]
+
+        if isinstance(item_type, type) and issubclass(item_type, BaseModel):
+            required = [key for key, item_field in item_type.model_fields.items() if item_field.is_required()]
+            checks[name] = lambda obj, required=required: isinstance(obj, dict) and all(key in obj for key in required)
+        elif isinstance(item_type, type):
+            checks[name] = lambda obj, item_type=item_type: isinstance(obj, item_type)
+
+    return checks
+
+
+class IncrementalJsonParser:
+    """Parses a JSON object while it is streamed. Every element of a top-level array is decoded and checked as soon as
+    it is complete, so broken outputs are detected early. Scanning is linear in the length of the output.
+
+    Incomplete objects (e.g. because the completion was cut off) are rejected by result(), since a truncated array
+    would otherwise pass as a valid, but partial scheme."""
+
+    def __init__(self, schema: Optional[Type[BaseModel]] = None):
+        self.elements: Dict[str, List] = defaultdict(list)
+        self._checks = create_item_checks(schema) if schema else {}
+
+        self._text = ""
+        self._position = 0
+        self._start = None              # position of the opening brace of the object
+        self._end = None                # position after the closing brace of the object
+        self._stack = []
+        self._in_string = False
+        self._string_start = None
+        self._expect_key = False
+        self._key = None
+        self._element_start = None
+
+    def feed(self, chunk: str):
+        """scans the next chunk of the stream. Raises an OutputParserException if the output is broken."""
+        if self._end is not None or not chunk:
+            return
+
+        self._text += chunk
+        self._scan()
+
+    def result(self) -> Dict:
+        """returns the parsed object. Raises an OutputParserException if the object is incomplete or invalid."""
+        if self._end is None:
+            raise OutputParserException(f"Incomplete json output: {self._text[-200:]}", llm_output=self._text)
+
+        try:
+            return json.loads(self._text[self._start:self._end])
+        except ValueError:
+            raise OutputParserException(f"Invalid json output: {self._text[:200]}", llm_output=self._text)
+
+    def _scan(self):
+        text = self._text
+        i = self._position
+
+        while i < len(text) and self._end is None:
+            if self._in_string:
+                match = _string_special_pattern.search(text, i)
+
+                if match is None:
+                    i = len(text)
+                    break
+
+                i = match.start()
+
+                if text[i] == "\\":
+                    # skip the escaped character (it may still be missing)
+                    if i + 1 >= len(text):
+                        break
+
+                    i += 2
+                    continue
+
+                self._in_string = False
+                self._close_string(i)
+                i += 1
+                continue
+
+            char = text[i]
+
+            if self._start is None:
+                # skip any text before the object (e.g. markdown code fences)
+                if char == "{":
+                    self._start = i
+                    self._stack.append(char)
+                    self._expect_key = True
+
+                i += 1
+                continue
+
+            if char in " \t\r\n":
+                pass
+            elif char == '"':
+                self._begin_value(i)
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                self._begin_value(i)
+                self._stack.append(char)
+            elif char in "}]":
+                self._close_container(char, i)
+            elif char == ",":
+                self._end_scalar(i)
+                self._expect_key = self._stack == ["{"]
+            elif char == ":" and self._stack == ["{"]:
+                self._expect_key = False
+            else:
+                self._begin_value(i)
+
+            i += 1
+
+        self._position = i
+
+    def _in_array(self) -> bool:
+        return self._stack == ["{", "["]
+
+    def _begin_value(self, i: int):
+        if self._in_array() and self._element_start is None:
+            self._element_start = i
+
+    def _close_string(self, i: int):
+        if self._stack == ["{"] and self._expect_key:
+            self._key = json.loads(self._text[self._string_start:i + 1])
+        elif self._in_array() and self._element_start == self._string_start:
+            self._emit(i + 1)
+
+    def _close_container(self, char: str, i: int):
+        self._end_scalar(i)
+
+        if not self._stack or self._stack.pop() != ("{" if char == "}" else "["):
+            raise OutputParserException(f"Invalid json output: unexpected {char!r} at position {i}",
+                                        llm_output=self._text)
+
+        if not self._stack:
+            self._end = i + 1
+        elif self._in_array() and self._element_start is not None:
+            self._emit(i + 1)
+
+    def _end_scalar(self, i: int):
+        """emits a pending number or literal within a top-level array"""
+        if self._in_array() and self._element_start is not None:
+            self._emit(i)
+
+    def _emit(self, end: int):
+        """decodes and checks the element ending at the given position"""
+        span = self._text[self._element_start:end]
+        self._element_start = None
+
+        try:
+            element = json.loads(span)
+        except ValueError:
+            raise OutputParserException(f"Invalid json element of {self._key}: {span[:200]}", llm_output=self._text)
+
+        check = self._checks.get(self._key)
+        if check and not check(element):
+            raise OutputParserException(f"Invalid element of {self._key}: {span[:200]}", llm_output=self._text)
+
+        self.elements[self._key].append(element)
@@ -1,38 +1,208 @@
+import asyncio
+import os
+import time
 from abc import abstractmethod, ABC
-from typing import Dict
+from threading import Lock
+from typing import Dict, List, Optional, Type
 
-import tiktoken
 from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, BaseMessageChunk
 from langchain_core.output_parsers import BaseOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
 from langchain_mistralai import ChatMistralAI
 from langchain_openai import ChatOpenAI
-from mistral_common.protocol.instruct.messages import UserMessage
-from mistral_common.protocol.instruct.request import ChatCompletionRequest
-from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+from pydantic import BaseModel
+
+from llm.client_registry import get_chat_model, get_http_clients
+from llm.json_stream import IncrementalJsonParser
+from llm.rate_limiter import TokenBucket, get_token_bucket
+from llm.tokenizers import count_mistral_tokens, count_openai_tokens, estimate_tokens
+from metrics.prometheus_metrics import llm_call_duration, llm_calls, llm_errors, llm_tokens
+from utils import get_env_flag
 
 
 class BaseLLM(ABC):
     """Wrapper class for the LLM used for concept map extraction."""
 
+    # number of completion tokens reserved for every call before its actual usage is known
+    expected_completion_tokens = 2_000
+
     def __init__(self, llm: BaseChatModel):
         self.llm = llm
 
+        # if enabled, outputs of pydantic-parsers are requested as schema-bound tool calls and parsed while streaming
+        self.structured_output = get_env_flag("CM_STRUCTURED_OUTPUT")
+
+        # tokens used by the calls of this instance (as reported by the provider, cached prompt tokens are the part of
+        # the prompt tokens read from the providers prompt cache)
+        self.usage = {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0}
+        self._usage_lock = Lock()
+
     def generate(self, prompt: ChatPromptTemplate, params: Dict[str, str], parser: BaseOutputParser = None):
         """Takes a prompt-template and a dictionary of parameters completing the prompt and generates the output of
-        the llm."""
+        the llm. Calls are throttled by the process-wide token-bucket of the model."""
+        messages = prompt.format_messages(**params)
+        reserved = self._estimate_tokens(messages)
 
-        if parser:
-            chain = prompt | self.llm | parser
-        else:
-            chain = prompt | self.llm
+        self._get_token_bucket().acquire(reserved)
+        schema = self._get_schema(parser)
+
+        if schema:
+            json_parser = IncrementalJsonParser(schema)
+            self._settle(reserved, lambda: self._stream_structured(messages, schema, json_parser))
+            return json_parser.result()
+
+        message = self._settle(reserved, lambda: self.llm.invoke(messages))
+
+        return parser.invoke(message) if parser else message
+
+    def generate_batch(self, prompt: ChatPromptTemplate, params: List[Dict[str, str]],
+                       parser: BaseOutputParser = None, max_concurrency: int = 8) -> List:
+        """Like generate, but completes the prompt-template once for every given dictionary of parameters. The calls
+        are executed concurrently (at most max_concurrency at a time) and the outputs are returned in input order."""
+        runnable = RunnableLambda(lambda p: self.generate(prompt, p, parser))
+        return runnable.batch(params, config={"max_concurrency": max_concurrency})
+
+    async def agenerate(self, prompt: ChatPromptTemplate, params: Dict[str, str], parser: BaseOutputParser = None):
+        """Asynchronous version of generate, that doesn't block the event loop while waiting for the llm."""
+        messages = prompt.format_messages(**params)
+        reserved = self._estimate_tokens(messages)
+
+        await self._get_token_bucket().aacquire(reserved)
+        schema = self._get_schema(parser)
+
+        if schema:
+            json_parser = IncrementalJsonParser(schema)
+            await self._asettle(reserved, lambda: self._astream_structured(messages, schema, json_parser))
+            return json_parser.result()
+
+        message = await self._asettle(reserved, lambda: self.llm.ainvoke(messages))
+
+        return parser.invoke(message) if parser else message
+
+    async def agenerate_batch(self, prompt: ChatPromptTemplate, params: List[Dict[str, str]],
+                              parser: BaseOutputParser = None, max_concurrency: int = 8) -> List:
+        """Asynchronous version of generate_batch."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate_one(p):
+            async with semaphore:
+                return await self.agenerate(prompt, p, parser)
+
+        return list(await asyncio.gather(*(generate_one(p) for p in params)))
+
+    def _get_schema(self, parser: Optional[BaseOutputParser]) -> Optional[Type[BaseModel]]:
+        """returns the pydantic model of the parser, if structured outputs are enabled"""
+        if not self.structured_output:
+            return None
+
+        return getattr(parser, "pydantic_object", None)
+
+    def _bind_schema(self, schema: Type[BaseModel]) -> Runnable:
+        """returns the chat model forced to answer by calling a tool with the given schema"""
+        return self.llm.bind_tools([schema], tool_choice=schema.__name__)
+
+    def _stream_structured(self, messages: List[BaseMessage], schema: Type[BaseModel],
+                           json_parser: IncrementalJsonParser) -> BaseMessageChunk:
+        """streams the schema-bound completion into the parser and returns the complete message. Broken outputs raise
+        an OutputParserException, which aborts the stream."""
+        message = None
+
+        for chunk in self._bind_schema(schema).stream(messages):
+            message = chunk if message is None else message + chunk
+            json_parser.feed(_get_json_delta(chunk))
 
-        message = chain.invoke(params)
         return message
 
-    @abstractmethod
-    def num_tokens_from_string(self, string: str) -> str:
+    async def _astream_structured(self, messages: List[BaseMessage], schema: Type[BaseModel],
+                                  json_parser: IncrementalJsonParser) -> BaseMessageChunk:
+        """asynchronous version of _stream_structured"""
+        message = None
+
+        async for chunk in self._bind_schema(schema).astream(messages):
+            message = chunk if message is None else message + chunk
+            json_parser.feed(_get_json_delta(chunk))
+
+        return message
+
+    def _get_token_bucket(self) -> TokenBucket:
+        return get_token_bucket(type(self).__name__, self.model_name, self.rate_limit())
+
+    def _estimate_tokens(self, messages: List[BaseMessage]) -> int:
+        """estimates the number of tokens a call with the given messages consumes (prompt and completion)"""
+        # a cheap approximation is sufficient, the reservation is corrected by the actual usage afterwards
+        prompt_tokens = sum(self.estimate_tokens(str(message.content)) for message in messages)
+        return prompt_tokens + self.expected_completion_tokens
+
+    def _settle(self, reserved: int, call):
+        """executes the call and corrects the reservation within the token-bucket by the reported usage"""
+        start = time.perf_counter()
+
+        try:
+            message = call()
+        except Exception as err:
+            # failed calls usually don't produce output, so the reserved completion tokens are returned
+            self._get_token_bucket().adjust(reserved, reserved - self.expected_completion_tokens)
+            self._record_error(err, start)
+            raise
+
+        self._get_token_bucket().adjust(reserved, _get_used_tokens(message, reserved))
+        self._record_usage(message, start)
+        return message
+
+    async def _asettle(self, reserved: int, call):
+        """asynchronous version of _settle"""
+        start = time.perf_counter()
+
+        try:
+            message = await call()
+        except asyncio.CancelledError:
+            # cancelled calls (e.g. speculative generations) are treated like failed calls within the token-bucket
+            self._get_token_bucket().adjust(reserved, reserved - self.expected_completion_tokens)
+            raise
+        except Exception as err:
+            self._get_token_bucket().adjust(reserved, reserved - self.expected_completion_tokens)
+            self._record_error(err, start)
+            raise
+
+        self._get_token_bucket().adjust(reserved, _get_used_tokens(message, reserved))
+        self._record_usage(message, start)
+        return message
+
+    def _record_usage(self, message: BaseMessage, start: float):
+        usage = getattr(message, "usage_metadata", None) or {}
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += usage.get("input_tokens", 0)
+            self.usage["cached_prompt_tokens"] += cached_tokens
+            self.usage["completion_tokens"] += usage.get("output_tokens", 0)
+
+        llm_calls.inc(model=self.model_name, outcome="success")
+        llm_call_duration.observe(time.perf_counter() - start, model=self.model_name)
+        llm_tokens.inc(usage.get("input_tokens", 0), model=self.model_name, type="prompt")
+        llm_tokens.inc(cached_tokens, model=self.model_name, type="cached_prompt")
+        llm_tokens.inc(usage.get("output_tokens", 0), model=self.model_name, type="completion")
+
+    def _record_error(self, err: Exception, start: float):
+        llm_calls.inc(model=self.model_name, outcome="error")
+        llm_call_duration.observe(time.perf_counter() - start, model=self.model_name)
+        llm_errors.inc(model=self.model_name, error=type(err).__name__)
+
+    def num_tokens_from_string(self, string: str) -> int:
         """Given a string returns the number of tokens the given string consists of"""
+        return self.count_tokens([string])[0]
+
+    @abstractmethod
+    def count_tokens(self, strings: List[str]) -> List[int]:
+        """Given a list of strings returns the number of tokens of each string"""
+
+    @staticmethod
+    def estimate_tokens(string: str) -> int:
+        """Returns a cheap approximation of the number of tokens the given string consists of"""
+        return estimate_tokens(string)
 
     @abstractmethod
     def context_length(self) -> int:
@@ -43,23 +213,49 @@ class BaseLLM(ABC):
         """Returns the api rate limit for the specified LLM in tokens per minute"""
 
 
+def _get_used_tokens(message: BaseMessage, default: int) -> int:
+    """Helper-function returning the number of tokens a call consumed according to the providers usage metadata"""
+    usage = getattr(message, "usage_metadata", None)
+
+    if usage and usage.get("total_tokens"):
+        return usage["total_tokens"]
+
+    return default
+
+
+def _get_json_delta(chunk: BaseMessageChunk) -> str:
+    """Helper-function returning the JSON text of a streamed chunk (the tool call arguments, or the content if the
+    model answers without a tool call)"""
+    tool_call_chunks = getattr(chunk, "tool_call_chunks", None)
+
+    if tool_call_chunks:
+        return "".join(tool_call["args"] or "" for tool_call in tool_call_chunks)
+
+    return chunk.content if isinstance(chunk.content, str) else ""
+
+
 class OpenAiLLM(BaseLLM):
 
     def __init__(self, openai_api_key: str, model_name: str = "gpt-4o", temp: float = 0.7) -> None:
-        llm = ChatOpenAI(
-            model=model_name,
-            temperature=temp,
-            timeout=None,
-            max_retries=3,
-            api_key=openai_api_key)
-
-        super().__init__(llm)
+        def create_chat_model():
+            http_client, http_async_client = get_http_clients(("openai",))
+
+            return ChatOpenAI(
+                model=model_name,
+                temperature=temp,
+                timeout=None,
+                max_retries=3,
+                stream_usage=True,
+                api_key=openai_api_key,
+                http_client=http_client,
+                http_async_client=http_async_client)
+
+        # chat models (and their connection pools) are shared between all instances with the same settings
+        super().__init__(get_chat_model("openai", model_name, temp, openai_api_key, create_chat_model))
         self.model_name = model_name
 
-    def num_tokens_from_string(self, string: str) -> int:
-        encoding = tiktoken.encoding_for_model(self.model_name)
-        num_tokens = len(encoding.encode(string))
-        return num_tokens
+    def count_tokens(self, strings: List[str]) -> List[int]:
+        return count_openai_tokens(self.model_name, strings)
 
     def context_length(self) -> int:
         context_lengths = {
@@ -92,28 +288,33 @@ class OpenAiLLM(BaseLLM):
 
 class MistralAiLLM(BaseLLM):
     def __init__(self, mistral_api_key: str, model_name: str = "mistral-large-latest", temp: float = 0.7) -> None:
-        llm = ChatMistralAI(
-            model=model_name,
-            temperature=temp,
-            timeout=240,
-            max_retries=3,
-            mistral_api_key=mistral_api_key)
-
-        super().__init__(llm)
+        def create_chat_model():
+            # the mistral clients carry the api key within their headers, so the pools are separated by key
+            client, async_client = get_http_clients(
+                ("mistral", mistral_api_key),
+                base_url=os.getenv("MISTRAL_BASE_URL", "https://api.mistral.ai/v1"),
+                headers={
+                    "Content-Type": "application/json",
+                    "Accept": "application/json",
+                    "Authorization": f"Bearer {mistral_api_key}"
+                },
+                timeout=240)
+
+            return ChatMistralAI(
+                model=model_name,
+                temperature=temp,
+                timeout=240,
+                max_retries=3,
+                mistral_api_key=mistral_api_key,
+                client=client,
+                async_client=async_client)
+
+        # chat models (and their connection pools) are shared between all instances with the same settings
+        super().__init__(get_chat_model("mistral", model_name, temp, mistral_api_key, create_chat_model))
         self.model_name = model_name
 
-    def num_tokens_from_string(self, string: str) -> int:
-        tokenizer = MistralTokenizer.v3()
-        tokens = tokenizer.encode_chat_completion(
-            ChatCompletionRequest(
-                messages=[
-                    UserMessage(content=str)
-                ],
-                model=self.model_name
-            )
-        ).tokens
-
-        return len(tokens)
+    def count_tokens(self, strings: List[str]) -> List[int]:
+        return count_mistral_tokens(strings)
 
     def context_length(self) -> int:
         context_lengths = {
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from threading import Lock
+from typing import Dict, Tuple
+
+
+class TokenBucket:
+    """Token-bucket limiting the number of llm-tokens per minute. Callers reserve tokens in advance: the bucket may run
+    into debt, and each caller waits until its reservation is covered by the refill. This serves waiting callers in the
+    order of their reservation (first come, first served) without any polling."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.refill_rate = tokens_per_minute / 60    # tokens per second
+
+        self._tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._lock = Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """reserves the given number of tokens and returns the number of seconds the caller has to wait"""
+        # requests larger than the bucket could never be served, so they are limited to its capacity
+        tokens = min(tokens, self.capacity)
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+            self._last_refill = now
+
+            self._tokens -= tokens
+
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self.refill_rate
+
+    def acquire(self, tokens: int):
+        """blocks until the given number of tokens is available"""
+        wait = self._reserve(tokens)
+
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int):
+        """waits (without blocking the event loop) until the given number of tokens is available"""
+        wait = self._reserve(tokens)
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def adjust(self, reserved: int, used: int):
+        """corrects the budget after the actual usage of a reservation is known (returns unused tokens or charges
+        additional ones)"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(reserved, self.capacity) - used)
+
+
+_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+_buckets_lock = Lock()
+
+
+def get_token_bucket(provider: str, model_name: str, tokens_per_minute: int) -> TokenBucket:
+    """returns the process-wide token-bucket of the given model (created on first use)"""
+    key = (provider, model_name)
+
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(tokens_per_minute)
+
+        return _buckets[key]
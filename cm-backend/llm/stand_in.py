@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Type
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+
+from llm.models import BaseLLM
+from llm.tokenizers import estimate_tokens
+
+
+class StandInChatModel(BaseChatModel):
+    """Deterministic chat model answering summary prompts with a summary-object, fused prompts with both and all other
+    prompts with a scheme. The answers only depend on the input, every call takes latency_s seconds and reports the
+    estimated prompt tokens and completion_tokens as usage."""
+
+    latency_s: float = 1.0
+    completion_tokens: int = 500
+    num_concepts: int = 12
+
+    @property
+    def _llm_type(self) -> str:
+        return "stand-in"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_s)
+        return self._create_result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                         **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency_s)
+        return self._create_result(messages)
+
+    def _create_result(self, messages: List[BaseMessage]) -> ChatResult:
+        system = " ".join(str(message.content) for message in messages if message.type == "system")
+        content = str(messages[-1].content)
+
+        if '"concept_map"' in system:
+            summary = create_summary(content, self.num_concepts)
+            answer = {"summary": summary, "concept_map": create_scheme(json.dumps(summary), self.num_concepts)}
+        elif '"main_concepts"' in system:
+            answer = create_summary(content, self.num_concepts)
+        else:
+            answer = create_scheme(content, self.num_concepts)
+
+        prompt_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        message = AIMessage(content=json.dumps(answer), usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": self.completion_tokens,
+            "total_tokens": prompt_tokens + self.completion_tokens
+        })
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def create_summary(text: str, num_concepts: int) -> Dict:
+    """returns a summary-object with num_concepts concepts named after the given text, every concept is related to its
+    successor and to a concept chosen by the hash of the text"""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    concepts = [f"Concept {digest[:6]} {i}" for i in range(num_concepts)]
+    offset = int(digest[:8], 16) % max(1, num_concepts - 1) + 1
+
+    relations = []
+    for i, concept in enumerate(concepts):
+        relations.append(f"{concept} leads to {concepts[(i + 1) % num_concepts]}")
+        relations.append(f"{concept} depends on {concepts[(i + offset) % num_concepts]}")
+
+    return {
+        "title": f"Stand-in summary {digest[:6]}",
+        "summary": text[:200],
+        "importance": "It is a stand-in.",
+        "focusing_question": "How does the stand-in behave?",
+        "main_concepts": concepts,
+        "relations": relations
+    }
+
+
+def create_scheme(content: str, num_concepts: int) -> Dict:
+    """returns the scheme of the given summary-object (or of a summary of the given text, if it is no summary)"""
+    try:
+        summary = json.loads(content)
+        concepts, relations = summary["main_concepts"], summary["relations"]
+    except (ValueError, TypeError, KeyError):
+        summary = create_summary(content, num_concepts)
+        concepts, relations = summary["main_concepts"], summary["relations"]
+
+    ids = {concept: f"c{i}" for i, concept in enumerate(concepts)}
+    scheme = {
+        "concepts": [{"concept_id": ids[concept], "type": "Stand_in", "properties": {"name": concept}}
+                     for concept in concepts],
+        "relations": []
+    }
+
+    # relations have the form "<concept> <predicate> <concept>"
+    for relation in relations:
+        source = next((concept for concept in concepts if relation.startswith(concept + " ")), None)
+        target = next((concept for concept in concepts if relation.endswith(" " + concept)), None)
+
+        if source and target:
+            predicate = relation[len(source):-len(target)].strip().replace(" ", "_")
+            scheme["relations"].append({"from_concept": ids[source], "to_concept": ids[target],
+                                        "predicate": predicate, "properties": {}})
+
+    return scheme
+
+
+class StandInLLM(BaseLLM):
+    """LLM for offline tests and load tests, answering without any network calls. Its latency, completion tokens and
+    number of concepts are configured by the environment variables CM_STAND_IN_LATENCY_S (default: 1),
+    CM_STAND_IN_COMPLETION_TOKENS (default: 500) and CM_STAND_IN_CONCEPTS (default: 12)."""
+
+    def __init__(self, model_name: str = "stand-in", temp: float = 0.7) -> None:
+        super().__init__(StandInChatModel(
+            latency_s=float(os.getenv("CM_STAND_IN_LATENCY_S") or 1),
+            completion_tokens=int(os.getenv("CM_STAND_IN_COMPLETION_TOKENS") or 500),
+            num_concepts=int(os.getenv("CM_STAND_IN_CONCEPTS") or 12)
+        ))
+        self.model_name = model_name
+
+    def _bind_schema(self, schema: Type[BaseModel]) -> Runnable:
+        # the stand-in answers with JSON content instead of tool calls, which is parsed the same way
+        return self.llm
+
+    def count_tokens(self, strings: List[str]) -> List[int]:
+        return [estimate_tokens(string) for string in strings]
+
+    def context_length(self) -> int:
+        return 128_000
+
+    def rate_limit(self) -> int:
+        # load tests measure the backend, not the rate limit of a provider
+        return 100_000_000
@@ -0,0 +1,98 @@
+#! /usr/bin/env python
+"""Registry of the tokenizers used for counting tokens. Each tokenizer is loaded once per process. The tiktoken
+encodings are read from the directory given by CM_TOKENIZER_CACHE_DIR (or TIKTOKEN_CACHE_DIR), which can be pre-warmed
+with `python -m llm.tokenizers`, so counting works without network access. The mistral tokenizer is bundled with
+mistral-common.
+"""
+import logging
+import math
+import os
+from threading import Lock
+from typing import Dict, List, Optional
+
+import tiktoken
+from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+
+logger = logging.getLogger(__name__)
+
+# average number of characters per token, used for cheap approximations
+CHARS_PER_TOKEN = 4
+
+# encoding used for openai models unknown to tiktoken
+DEFAULT_ENCODING = "o200k_base"
+
+# number of threads tiktoken uses for batch encoding
+NUM_THREADS = 8
+
+_encodings: Dict[str, Optional[tiktoken.Encoding]] = {}
+_mistral_tokenizer = None
+_lock = Lock()
+
+
+def estimate_tokens(string: str) -> int:
+    """returns a cheap approximation of the number of tokens of the given string (without tokenizing it)"""
+    return math.ceil(len(string) / CHARS_PER_TOKEN)
+
+
+def get_tiktoken_encoding(model_name: str) -> Optional[tiktoken.Encoding]:
+    """returns the tiktoken encoding of the given openai model or None if it can't be loaded (e.g. when offline
+    without a pre-warmed cache directory)"""
+    try:
+        encoding_name = tiktoken.encoding_name_for_model(model_name)
+    except KeyError:
+        encoding_name = DEFAULT_ENCODING
+
+    with _lock:
+        if encoding_name not in _encodings:
+            if os.getenv("CM_TOKENIZER_CACHE_DIR"):
+                os.environ.setdefault("TIKTOKEN_CACHE_DIR", os.getenv("CM_TOKENIZER_CACHE_DIR"))
+
+            try:
+                _encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+            except Exception as err:
+                # remember the failure, so the download isn't retried on every call
+                logger.warning(f"Could not load tiktoken encoding {encoding_name}, falling back to estimated token "
+                               f"counts: {err}")
+                _encodings[encoding_name] = None
+
+        return _encodings[encoding_name]
+
+
+def count_openai_tokens(model_name: str, strings: List[str]) -> List[int]:
+    """returns the number of tokens of each given string for the given openai model"""
+    encoding = get_tiktoken_encoding(model_name)
+
+    if encoding is None:
+        return [estimate_tokens(string) for string in strings]
+
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(strings, num_threads=NUM_THREADS)]
+
+
+def get_mistral_tokenizer():
+    """returns the (raw) tokenizer used by mistral models"""
+    global _mistral_tokenizer
+
+    with _lock:
+        if _mistral_tokenizer is None:
+            _mistral_tokenizer = MistralTokenizer.v3().instruct_tokenizer.tokenizer
+
+        return _mistral_tokenizer
+
+
+def count_mistral_tokens(strings: List[str]) -> List[int]:
+    """returns the number of tokens of each given string for mistral models"""
+    tokenizer = get_mistral_tokenizer()
+    return [len(tokenizer.encode(string, bos=False, eos=False)) for string in strings]
+
+
+if __name__ == '__main__':
+    # pre-warm the cache directory with the encodings of all supported models
+    from utils import valid_models
+
+    for model in valid_models:
+        if "mistral" in model:
+            get_mistral_tokenizer()
+        elif get_tiktoken_encoding(model) is None:
+            raise SystemExit(f"Could not load the encoding of {model}!")
+
+    print(f"Tokenizers loaded (cache directory: {os.getenv('TIKTOKEN_CACHE_DIR')})")
@@ -0,0 +1,257 @@
+import re
+import unicodedata
+from typing import Dict, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+# minimum jaccard similarity of the character trigrams of two normalized names to treat them as duplicates
+SIMILARITY_THRESHOLD = 0.7
+
+# minhash signatures consist of BANDS * ROWS values of 16 bits (the rows of a band form a 64 bit key), names sharing all
+# rows of a band become candidates (names with a similarity of 0.7 are found with a probability of 96%)
+BANDS = 12
+ROWS = 4
+
+# larger buckets of the lsh index (e.g. very common names) are skipped, since they would require quadratic comparisons
+MAX_BUCKET_SIZE = 64
+
+_non_word_pattern = re.compile(r"[\W_]+")
+_digits_pattern = re.compile(r"\d+")
+_articles = {"a", "an", "the"}
+
+def normalize_name(name: str) -> str:
+    """returns the name in lowercase without accents, punctuation, leading articles and plural-s"""
+    name = str(name)
+
+    if not name.isascii():
+        name = "".join(char for char in unicodedata.normalize("NFKD", name) if not unicodedata.combining(char))
+
+    tokens = _non_word_pattern.sub(" ", name.lower()).split()
+
+    if len(tokens) > 1 and tokens[0] in _articles:
+        tokens = tokens[1:]
+
+    return " ".join([_singularize(token) for token in tokens])
+
+
+def _singularize(token: str) -> str:
+    """returns the token without a regular english plural ending (a heuristic, irregular plurals are kept)"""
+    if len(token) <= 3 or not token.endswith("s") or token.endswith(("ss", "us", "is")):
+        return token
+
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+
+    if token.endswith(("sses", "xes", "ches", "shes")):
+        return token[:-2]
+
+    return token[:-1]
+
+
+def get_concept_name(concept: Dict) -> str:
+    """returns the name of the concept (its id, if it has no name)"""
+    properties = concept.get("properties") or {}
+    return str(properties.get("name", concept.get("concept_id", "")))
+
+
+def find_duplicates(names: List[str], threshold: float = SIMILARITY_THRESHOLD) -> List[int]:
+    """returns the index of the representative (its first occurrence) of every name. Equal normalized names are
+    duplicates, similar ones are found by a minhash lsh index over character trigrams and compared by the jaccard
+    similarity of their trigrams. Names containing different numbers and names extending the other name by further
+    words are never merged."""
+    if not names:
+        return []
+
+    normalized = [normalize_name(name) for name in names]
+
+    # exact duplicates of the normalized names (names consisting of punctuation only have to be equal)
+    first = {}
+    sources = np.array([first.setdefault(name or str(names[i]), i) for i, name in enumerate(normalized)])
+    targets = np.arange(len(names))
+
+    unique = np.array([i for i in first.values() if normalized[i]], dtype=np.int64)
+    if threshold < 1 and len(unique) > 1:
+        unique_names = [normalized[i] for i in unique]
+        owners, trigrams, num_trigrams = _get_trigrams(unique_names)
+
+        digit_ids = {}
+        digits = np.array([digit_ids.setdefault(tuple(_digits_pattern.findall(name)), len(digit_ids))
+                           for name in unique_names])
+
+        # names containing different numbers are never merged (e.g. versions or years)
+        pairs = _find_candidates(owners, trigrams, num_trigrams, threshold)
+        pairs = pairs[digits[pairs[:, 0]] == digits[pairs[:, 1]]]
+        pairs = pairs[_get_similarities(owners, trigrams, num_trigrams, pairs) >= threshold]
+
+        # a name extended by further words (e.g. "photosynthesis rate") is a different concept, usually related to it
+        tokens = [frozenset(name.split()) for name in unique_names]
+        pairs = pairs[[not (tokens[a] < tokens[b] or tokens[b] < tokens[a]) for a, b in pairs.tolist()]]
+
+        sources = np.concatenate((sources, unique[pairs[:, 0]]))
+        targets = np.concatenate((targets, unique[pairs[:, 1]]))
+
+    # duplicates are transitive, the first index of every component represents it
+    adjacency = sp.coo_matrix((np.ones(len(sources)), (sources, targets)), shape=(len(names), len(names)))
+    _, labels = connected_components(adjacency, directed=False)
+    representatives = np.full(labels.max() + 1, len(names))
+    np.minimum.at(representatives, labels, np.arange(len(names)))
+
+    return representatives[labels].tolist()
+
+
+def deduplicate_scheme(scheme: Dict, threshold: float = SIMILARITY_THRESHOLD) -> Tuple[Dict, Dict[str, str]]:
+    """merges duplicate concepts of the scheme into their first occurrence (which keeps its id and type, missing
+    properties are taken from the duplicates) and rewrites the relation endpoints. Duplicate relations and self-loops
+    caused by merging are removed. Returns the merged scheme and the mapping of merged concept ids."""
+    concepts = scheme["concepts"]
+    representatives = find_duplicates([get_concept_name(concept) for concept in concepts], threshold)
+
+    merged = {}
+    id_map = {}
+
+    # concepts and relations are only copied, if they change
+    for concept, representative in zip(concepts, representatives):
+        target = concepts[representative]["concept_id"]
+
+        if concept["concept_id"] != target:
+            id_map[concept["concept_id"]] = target
+
+        if target not in merged:
+            merged[target] = concept
+            continue
+
+        properties = merged[target].get("properties") or {}
+        missing = {key: value for key, value in (concept.get("properties") or {}).items() if key not in properties}
+
+        if missing:
+            merged[target] = {**merged[target], "properties": {**properties, **missing}}
+
+    relations = []
+    relation_keys = set()
+
+    for relation in scheme["relations"]:
+        from_concept = id_map.get(relation["from_concept"], relation["from_concept"])
+        to_concept = id_map.get(relation["to_concept"], relation["to_concept"])
+        key = (from_concept, to_concept, " ".join(str(relation["predicate"]).lower().split()))
+
+        if key in relation_keys or (from_concept == to_concept and relation["from_concept"] != relation["to_concept"]):
+            continue
+
+        relation_keys.add(key)
+        relations.append(_rename_endpoints(relation, id_map))
+
+    return {**scheme, "concepts": list(merged.values()), "relations": relations}, id_map
+
+
+def _rename_endpoints(relation: Dict, id_map: Dict[str, str]) -> Dict:
+    """Helper-function returning the relation with renamed endpoints (the relation itself, if none is renamed)"""
+    if relation["from_concept"] not in id_map and relation["to_concept"] not in id_map:
+        return relation
+
+    return {**relation, "from_concept": id_map.get(relation["from_concept"], relation["from_concept"]),
+            "to_concept": id_map.get(relation["to_concept"], relation["to_concept"])}
+
+
+def create_unique_id(concept_id: str, used_ids: set) -> str:
+    """returns the given id or, if it is already used, the id extended by the lowest free number"""
+    candidate, i = concept_id, 1
+
+    while candidate in used_ids:
+        candidate, i = f"{concept_id}_{i}", i + 1
+
+    return candidate
+
+
+def _get_trigrams(names: List[str]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """returns the distinct character trigrams of the names (padded, so short names get trigrams as well) as pairs of
+    the index of the name and the id of the trigram (sorted by the index of the name) and the number of trigram ids"""
+    lengths = np.array([len(name) + 2 for name in names], dtype=np.int64)
+    text = "\n".join(f" {name} " for name in names)
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+
+    # trigrams are encoded by their code points (21 bits each), the ones spanning two names are dropped
+    trigrams = codes[:-2] << 42 | codes[1:-1] << 21 | codes[2:]
+    valid = (codes[:-2] != ord("\n")) & (codes[1:-1] != ord("\n")) & (codes[2:] != ord("\n"))
+    owners = np.repeat(np.arange(len(names)), lengths + 1)[:len(codes) - 2][valid]
+
+    vocabulary, ids = np.unique(trigrams[valid], return_inverse=True)
+    keys = _unique(owners * len(vocabulary) + ids.ravel())
+
+    return keys // len(vocabulary), keys % len(vocabulary), len(vocabulary)
+
+
+def _find_candidates(owners: np.ndarray, trigrams: np.ndarray, num_trigrams: int, threshold: float,
+                     seed: int = 0) -> np.ndarray:
+    """returns the index pairs of all names sharing at least one band of their minhash signatures, whose jaccard
+    similarity estimated by the signatures is close to the threshold or above"""
+    starts = np.flatnonzero(np.diff(owners, prepend=-1))
+
+    # random values per trigram act as hash functions, the signature consists of their minima per name (16 bits per
+    # value suffice, equal minima of different trigrams are rare)
+    hashes = np.random.default_rng(seed).integers(0, 1 << 16, size=(BANDS * ROWS, num_trigrams), dtype=np.uint16)
+    signatures = np.stack([np.minimum.reduceat(values[trigrams], starts) for values in hashes], axis=1)
+
+    # the four values of a band form a 64 bit key
+    keys = signatures.view(np.uint64)
+    pairs = [_get_bucket_pairs(keys[:, band]) for band in range(BANDS)]
+
+    # pairs are encoded as single integers to remove the ones found by several bands
+    encoded = _unique(np.concatenate(pairs))
+    pairs = np.stack((encoded // len(starts), encoded % len(starts)), axis=1)
+
+    # the share of equal signature values estimates the jaccard similarity (with a standard error < 0.075, so pairs
+    # slightly below the threshold are kept for the exact comparison)
+    estimates = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    return pairs[estimates >= threshold - 0.15]
+
+
+def _get_bucket_pairs(keys: np.ndarray) -> np.ndarray:
+    """returns the index pairs of all names with equal keys, encoded as smaller index * len(keys) + larger index.
+    Buckets exceeding MAX_BUCKET_SIZE are skipped."""
+    order = np.argsort(keys, kind="stable")
+    starts = np.flatnonzero(np.concatenate(([True], keys[order][1:] != keys[order][:-1])))
+    sizes = np.diff(starts, append=len(order))
+
+    valid = (sizes > 1) & (sizes <= MAX_BUCKET_SIZE)
+    positions = _get_ranges(starts[valid], sizes[valid])
+    bucket_ends = np.repeat(starts[valid] + sizes[valid], sizes[valid])
+
+    # every position is paired with the following positions within its bucket, the order is ascending by index
+    pairs = []
+    for distance in range(1, int(sizes[valid].max(initial=1))):
+        within = positions[positions + distance < bucket_ends]
+        pairs.append(order[within] * len(keys) + order[within + distance])
+
+    return np.concatenate(pairs) if pairs else np.empty(0, dtype=np.int64)
+
+
+def _get_similarities(owners: np.ndarray, trigrams: np.ndarray, num_trigrams: int, pairs: np.ndarray) -> np.ndarray:
+    """returns the exact jaccard similarity of the trigrams of every index pair"""
+    starts = np.flatnonzero(np.diff(owners, prepend=-1))
+    counts = np.diff(starts, append=len(owners))
+
+    # trigrams of both names are tagged with the number of the pair, shared trigrams occur twice after sorting
+    keys = []
+    for side in (pairs[:, 0], pairs[:, 1]):
+        tags = np.repeat(np.arange(len(pairs)), counts[side])
+        keys.append(tags * num_trigrams + trigrams[_get_ranges(starts[side], counts[side])])
+
+    keys = np.sort(np.concatenate(keys))
+    shared = keys[1:][keys[1:] == keys[:-1]] // num_trigrams
+    intersections = np.bincount(shared, minlength=len(pairs))
+
+    return intersections / (counts[pairs[:, 0]] + counts[pairs[:, 1]] - intersections)
+
+
+def _unique(values: np.ndarray) -> np.ndarray:
+    """returns the sorted distinct values (sorting is considerably faster than the hash-based np.unique for integers)"""
+    values = np.sort(values)
+    return values[np.diff(values, prepend=values[:1] - 1) != 0]
+
+
+def _get_ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """returns the concatenated ranges [start, start + length) of all starts and lengths"""
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(len(offsets))
@@ -0,0 +1,164 @@
+import bisect
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# upper bounds (in seconds) of the latency buckets, from fast local stages up to slow llm calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+
+_registry = []
+_registry_lock = Lock()
+
+
+class Metric:
+    """Base class of the metrics exposed in the Prometheus text format. Values are kept per combination of labels."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        self._values = {}
+        self._lock = Lock()
+
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Dict] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+
+        if not pairs:
+            return ""
+
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+
+        return [f"{self.name}{self._format_labels(key)} {_format_value(value)}" for key, value in items]
+
+    def collect(self) -> List[str]:
+        """returns the lines of the metric in the Prometheus text format"""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """lets the (unlabeled) gauge report the value of the given function at collection time"""
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+
+        return super()._samples()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            # [count per bucket (the last one is +Inf), sum of the observed values]
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': le})} {cumulative}")
+
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+
+        return lines
+
+
+def render_metrics() -> str:
+    """returns all registered metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+
+    return "\n".join(line for metric in metrics for line in metric.collect()) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# metrics of the concept map generation
+stage_duration = Histogram("cm_stage_duration_seconds", "Duration of the stages of a concept map generation",
+                           ["stage", "model"])
+cache_lookups = Counter("cm_cache_lookups_total", "Lookups within the result cache", ["result"])
+
+# metrics of the llm calls
+llm_calls = Counter("cm_llm_calls_total", "Finished llm calls", ["model", "outcome"])
+llm_call_duration = Histogram("cm_llm_call_duration_seconds", "Duration of single llm calls", ["model"])
+llm_tokens = Counter("cm_llm_tokens_total", "Tokens used by llm calls as reported by the provider",
+                     ["model", "type"])
+llm_errors = Counter("cm_llm_errors_total", "Failed llm calls (after all retries of the client)", ["model", "error"])
+llm_http_responses = Counter("cm_llm_http_responses_total", "Http responses of the llm providers",
+                             ["provider", "status"])
+llm_retries = Counter("cm_llm_retries_total", "Retryable http responses (429 and 5xx) of the llm providers, that "
+                                              "cause the client to retry the request", ["provider"])
+
+# metrics of the http api and the background jobs
+http_requests_in_flight = Gauge("cm_http_requests_in_flight", "Http requests currently being processed")
+http_request_duration = Histogram("cm_http_request_duration_seconds", "Duration of http requests",
+                                  ["route", "method", "status"])
+jobs_queued = Gauge("cm_jobs_queued", "Background jobs waiting for a worker")
+jobs_running = Gauge("cm_jobs_running", "Background jobs currently being processed")
@@ -0,0 +1,119 @@
+import re
+from typing import List, Tuple
+
+from llm.models import BaseLLM
+
+# number of tokens kept free within the models context for the static prompt-parts and the generated output
+PROMPT_RESERVE_TOKENS = 4_000
+
+# upper bound for the size of a single chunk (smaller chunks can be summarized concurrently)
+MAX_CHUNK_TOKENS = 12_000
+
+# number of tokens at the end of a chunk that are repeated at the start of the following chunk
+CHUNK_OVERLAP_TOKENS = 200
+
+_paragraph_pattern = re.compile(r"\n\s*\n")
+_sentence_pattern = re.compile(r"(?<=[.!?])\s+")
+
+
+def get_chunk_budget(llm: BaseLLM, max_chunk_tokens: int = MAX_CHUNK_TOKENS) -> int:
+    """returns the maximum number of tokens a single chunk may consist of when processed by the given llm"""
+    return max(1, min(max_chunk_tokens, llm.context_length() - PROMPT_RESERVE_TOKENS))
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """returns the non-empty paragraphs of the text (separated by blank lines), stripped of surrounding whitespace"""
+    return [paragraph.strip() for paragraph in _paragraph_pattern.split(text) if paragraph.strip()]
+
+
+def _hard_split(segment: str, num_tokens: int, budget: int) -> List[str]:
+    """splits a segment without sentence boundaries into pieces of roughly budget tokens (estimated by characters)"""
+    piece_length = max(1, int(len(segment) * budget / num_tokens * 0.9))
+    return [segment[i:i + piece_length] for i in range(0, len(segment), piece_length)]
+
+
+def _split_segments(text: str, llm: BaseLLM, budget: int) -> List[Tuple[str, int, str]]:
+    """splits the text into segments (paragraphs, sentences or fixed-size pieces) not exceeding the budget. Each segment
+    is returned with its number of tokens and the separator that joins it to its predecessor."""
+    segments = []
+
+    paragraphs = split_paragraphs(text)
+
+    for paragraph, num_tokens in zip(paragraphs, llm.count_tokens(paragraphs)):
+        if num_tokens <= budget:
+            segments.append((paragraph, num_tokens, "\n\n"))
+            continue
+
+        # paragraph too large, fall back to sentences
+        separator = "\n\n"
+        sentences = _sentence_pattern.split(paragraph)
+
+        for sentence, num_tokens in zip(sentences, llm.count_tokens(sentences)):
+            if num_tokens <= budget:
+                segments.append((sentence, num_tokens, separator))
+            else:
+                # sentence still too large (e.g. text extracted without punctuation), split it by characters
+                pieces = _hard_split(sentence, num_tokens, budget)
+
+                for piece, piece_tokens in zip(pieces, llm.count_tokens(pieces)):
+                    segments.append((piece, piece_tokens, separator))
+                    separator = ""
+
+            separator = " "
+
+    return segments
+
+
+def split_text(text: str, llm: BaseLLM, max_chunk_tokens: int = MAX_CHUNK_TOKENS,
+               overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[str]:
+    """splits the given text into overlapping chunks, each fitting into the token budget of the given llm. Texts that
+    fit into a single chunk are returned unchanged."""
+    budget = get_chunk_budget(llm, max_chunk_tokens)
+
+    if llm.num_tokens_from_string(text) <= budget:
+        return [text]
+
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for segment in _split_segments(text, llm, budget):
+        num_tokens = segment[1]
+
+        if current and current_tokens + num_tokens > budget:
+            chunks.append(_join_segments(current))
+
+            # carry the last segments of the finished chunk over into the next one
+            overlap = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + previous[1] > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += previous[1]
+
+            # make sure the new segment still fits next to the overlap
+            while overlap and overlap_size + num_tokens > budget:
+                overlap_size -= overlap.pop(0)[1]
+
+            current = overlap
+            current_tokens = overlap_size
+
+        current.append(segment)
+        current_tokens += num_tokens
+
+    if current:
+        chunks.append(_join_segments(current))
+
+    return chunks
+
+
+def _join_segments(segments: List[Tuple[str, int, str]]) -> str:
+    """joins segments using their separators (the separator of the first segment is omitted)"""
+    parts = [segments[0][0]]
+
+    for text, _, separator in segments[1:]:
+        parts.append(separator)
+        parts.append(text)
+
+    return "".join(parts)
@@ -0,0 +1,49 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+_executor = None
+_render_executor = None
+_executor_lock = Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """returns the shared executor for blocking work (file io, evaluation, parsing, ...). The number of workers is
+    bounded by the environment variable CM_MAX_BLOCKING_WORKERS (default: 4)."""
+    global _executor
+
+    # created lazily, so the environment variables from the .env-file are already loaded
+    with _executor_lock:
+        if _executor is None:
+            max_workers = int(os.getenv("CM_MAX_BLOCKING_WORKERS") or 4)
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cm-blocking")
+
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """runs the given blocking function within the shared executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
+
+
+def get_render_executor() -> ThreadPoolExecutor:
+    """returns the executor for rendering concept maps. Renders may take up to twice the render timeout (including the
+    fallback), so they get their own threads instead of blocking the shared executor. The number of workers is given
+    by the environment variable CM_RENDER_WORKERS (default: number of cpus), which also bounds the layout processes."""
+    global _render_executor
+
+    with _executor_lock:
+        if _render_executor is None:
+            max_workers = int(os.getenv("CM_RENDER_WORKERS") or os.cpu_count() or 1)
+            _render_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cm-render")
+
+    return _render_executor
+
+
+async def run_rendering(func, *args, **kwargs):
+    """runs the given rendering function within the render executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_executor(), partial(func, *args, **kwargs))
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from evaluate.graph_evaluator import GraphEvaluator
+from llm.models import BaseLLM
+from pipeline.chunking import split_text
+from pipeline.executor import run_blocking
+from pipeline.progress import ProgressReporter
+from pipeline.summarize import asummarize_text
+from prompts.concept_extraction import get_default_extraction_prompt
+from prompts.fused_prompts import get_fused_prompt
+from prompts.one_shot_prompts import get_default_prompt, get_mathematical_prompt, get_scientific_prompt, \
+    get_wiki_text_prompt
+
+logger = logging.getLogger(__name__)
+
+# modes of the scheme generation:
+# - two-stage: a summary call followed by an extraction call
+# - fused: summary and scheme within a single call (two-stage for inputs exceeding a single chunk)
+# - speculative: one-shot and two-stage pipelines run concurrently, the first usable scheme wins
+valid_modes = ["two-stage", "fused", "speculative"]
+
+# one-shot prompts of the context presets
+one_shot_prompts = {
+    "default": get_default_prompt,
+    "scientific": get_scientific_prompt,
+    "wiki-text": get_wiki_text_prompt,
+    "mathematical": get_mathematical_prompt
+}
+
+# order in which the results of the speculative pipelines are preferred, if none of them is usable
+_speculation_preference = ["two-stage", "one-shot"]
+
+GenerationResult = Tuple[Optional[Dict], Dict]
+
+
+def check_mode(mode: Optional[str]) -> bool:
+    return mode in valid_modes
+
+
+def get_default_mode() -> str:
+    """returns the mode used by requests that don't specify one (environment variable CM_GENERATION_MODE, default:
+    two-stage)"""
+    mode = os.getenv("CM_GENERATION_MODE") or "two-stage"
+    return mode if check_mode(mode) else "two-stage"
+
+
+def is_usable(scheme: Dict) -> bool:
+    """returns True if the scheme forms a single connected graph without relations to missing concepts"""
+    try:
+        evaluator = GraphEvaluator(scheme)
+    except (KeyError, TypeError):
+        return False
+
+    return evaluator.count_missing_nodes() == 0 and evaluator.count_disconnected_components() == 1
+
+
+async def agenerate_one_shot(llm: BaseLLM, text: str, context: str, progress: ProgressReporter,
+                             stage: str = "extraction") -> GenerationResult:
+    """generates the scheme directly from the text with the one-shot prompt of the context preset"""
+    prompt, parser = one_shot_prompts[context]()
+
+    with progress.stage(stage, llm):
+        return None, await llm.agenerate(prompt, parser=parser, params={"input": text})
+
+
+async def agenerate_two_stage(llm: BaseLLM, text: str, text_type: str, nr_concepts: int,
+                              progress: ProgressReporter) -> GenerationResult:
+    """generates a summary-object from the text (chunk-wise for large inputs) and the scheme from the summary"""
+    extraction_prompt, extraction_parser = get_default_extraction_prompt()
+
+    with progress.stage("summarization", llm):
+        summary_obj = await asummarize_text(llm, text, text_type, nr_concepts)
+
+    progress.emit("summary", summary=summary_obj)
+
+    with progress.stage("extraction", llm):
+        return summary_obj, await llm.agenerate(extraction_prompt, parser=extraction_parser, params={
+            "input": json.dumps(summary_obj),
+        })
+
+
+async def agenerate_fused(llm: BaseLLM, text: str, text_type: str, nr_concepts: int,
+                          progress: ProgressReporter) -> GenerationResult:
+    """generates the summary-object and the scheme within a single call. Inputs exceeding a single chunk have to be
+    summarized chunk-wise, so they are processed in two stages."""
+    if len(await run_blocking(split_text, text, llm)) > 1:
+        return await agenerate_two_stage(llm, text, text_type, nr_concepts, progress)
+
+    prompt, parser = get_fused_prompt()
+
+    with progress.stage("fused_generation", llm):
+        output = await llm.agenerate(prompt, parser=parser, params={
+            "input": text,
+            "text_type": text_type,
+            "nr_concepts": nr_concepts
+        })
+
+    progress.emit("summary", summary=output["summary"])
+    return output["summary"], output["concept_map"]
+
+
+async def agenerate_speculative(llm: BaseLLM, text: str, context: str, text_type: str, nr_concepts: int,
+                                progress: ProgressReporter) -> GenerationResult:
+    """runs the one-shot and the two-stage pipeline concurrently and returns the first usable result. The other
+    pipeline is cancelled as soon as a usable result is found."""
+    if len(await run_blocking(split_text, text, llm)) > 1:
+        return await agenerate_two_stage(llm, text, text_type, nr_concepts, progress)
+
+    tasks = {
+        asyncio.ensure_future(agenerate_one_shot(llm, text, context, progress, "one_shot_extraction")): "one-shot",
+        asyncio.ensure_future(agenerate_two_stage(llm, text, text_type, nr_concepts, progress)): "two-stage"
+    }
+
+    results, errors = {}, {}
+    pending = set(tasks)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                if task.exception() is not None:
+                    errors[tasks[task]] = task.exception()
+                else:
+                    results[tasks[task]] = task.result()
+
+            selected = _select_usable(results, progress)
+            if selected:
+                return selected
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return _select_fallback(results, errors, progress)
+
+
+def _select_usable(results: Dict[str, GenerationResult], progress: ProgressReporter) -> Optional[GenerationResult]:
+    """Helper-function returning the first usable result of the finished pipelines (in order of preference)"""
+    for pipeline in _speculation_preference:
+        if pipeline in results and is_usable(results[pipeline][1]):
+            progress.emit("pipeline_selected", pipeline=pipeline, usable=True)
+            return results[pipeline]
+
+    return None
+
+
+def _select_fallback(results: Dict[str, GenerationResult], errors: Dict[str, Exception],
+                     progress: ProgressReporter) -> GenerationResult:
+    """Helper-function returning the preferred result if no pipeline produced a usable one (raises the error of the
+    preferred pipeline if all of them failed)"""
+    for pipeline in _speculation_preference:
+        if pipeline in results:
+            progress.emit("pipeline_selected", pipeline=pipeline, usable=False)
+            return results[pipeline]
+
+    for pipeline, err in errors.items():
+        logger.warning(f"Speculative {pipeline} pipeline failed: {err}")
+
+    raise next(errors[pipeline] for pipeline in _speculation_preference if pipeline in errors)
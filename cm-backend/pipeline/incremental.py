@@ -0,0 +1,175 @@
+import difflib
+import hashlib
+import json
+import math
+from typing import Dict, List, Optional, Tuple
+
+from llm.models import BaseLLM
+from merge.concept_merger import create_unique_id, find_duplicates, get_concept_name
+from pipeline.chunking import split_paragraphs
+from pipeline.progress import ProgressReporter
+from pipeline.summarize import asummarize_text
+from prompts.concept_extraction import get_update_extraction_prompt
+
+
+def hash_paragraph(paragraph: str) -> str:
+    return hashlib.sha256(paragraph.encode("utf-8")).hexdigest()[:16]
+
+
+def diff_paragraphs(old_text: str, new_text: str) -> Tuple[List[str], List[str]]:
+    """returns the paragraphs added to and the paragraphs removed from the old text (an edited paragraph is both)"""
+    old, new = split_paragraphs(old_text), split_paragraphs(new_text)
+    added, removed = [], []
+
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.extend(old[i1:i2])
+
+        if tag in ("replace", "insert"):
+            added.extend(new[j1:j2])
+
+    return added, removed
+
+
+def merge_scheme(scheme: Dict, addition: Dict, paragraphs: List[str]) -> Tuple[Dict, Dict]:
+    """merges the concepts and relations of the addition into a copy of the scheme. Existing concepts and relations
+    keep their ids and order (new ones are appended), so unchanged parts of the map keep their layout as far as
+    possible. New concepts named like existing ones (or like other new ones) are mapped onto those, new concepts reusing
+    the id of a differently named one get a new id. Returns the merged scheme and the contribution of the addition (its
+    source paragraphs and the added concepts and relations)."""
+    concepts = list(scheme["concepts"])
+    relations = list(scheme["relations"])
+
+    ids = {concept["concept_id"] for concept in concepts}
+    relation_keys = {_get_relation_key(relation) for relation in relations}
+    id_map = {}
+
+    contribution = {"paragraphs": [hash_paragraph(paragraph) for paragraph in paragraphs], "concepts": [],
+                    "relations": []}
+
+    additions = [{**concept, "concept_id": str(concept.get("concept_id", ""))}
+                 for concept in addition.get("concepts", [])]
+    additions = [concept for concept in additions if concept["concept_id"]]
+
+    # duplicates are searched by name within the concepts of the scheme followed by the added ones (the ids of added
+    # concepts are numbered independently of the scheme, so equal ids don't imply equal concepts)
+    targets = concepts + additions
+    representatives = find_duplicates([get_concept_name(concept) for concept in targets])
+    target_ids = [concept["concept_id"] for concept in concepts]
+
+    for concept, representative in zip(additions, representatives[len(concepts):]):
+        concept_id = concept["concept_id"]
+
+        if representative < len(target_ids):
+            # named like an existing (or a previously added) concept
+            target_ids.append(target_ids[representative])
+            id_map.setdefault(concept_id, target_ids[representative])
+            continue
+
+        if concept_id in ids:
+            # the id is used by a differently named concept, so the added concept gets a new one
+            concept = {**concept, "concept_id": create_unique_id(concept_id, ids)}
+            id_map.setdefault(concept_id, concept["concept_id"])
+
+        target_ids.append(concept["concept_id"])
+        concepts.append(concept)
+        ids.add(concept["concept_id"])
+        contribution["concepts"].append(concept["concept_id"])
+
+    for relation in addition.get("relations", []):
+        from_concept = id_map.get(relation.get("from_concept"), relation.get("from_concept"))
+        to_concept = id_map.get(relation.get("to_concept"), relation.get("to_concept"))
+
+        if from_concept not in ids or to_concept not in ids:
+            continue
+
+        relation = {**relation, "from_concept": from_concept, "to_concept": to_concept}
+        key = _get_relation_key(relation)
+
+        if key in relation_keys:
+            continue
+
+        relations.append(relation)
+        relation_keys.add(key)
+        contribution["relations"].append(list(key))
+
+    return {**scheme, "concepts": concepts, "relations": relations}, contribution
+
+
+def remove_stale_updates(scheme: Dict, updates: List[Dict], text: str) -> Tuple[Dict, List[Dict]]:
+    """removes the concepts and relations added by earlier updates, whose source paragraphs are no longer part of the
+    text (concepts still referenced by other relations are kept). Concepts and relations of the initial generation are
+    never removed, since their sources are unknown."""
+    present = {hash_paragraph(paragraph) for paragraph in split_paragraphs(text)}
+    stale = [update for update in updates if not any(paragraph in present for paragraph in update["paragraphs"])]
+
+    if not stale:
+        return scheme, updates
+
+    stale_relations = {tuple(key) for update in stale for key in update["relations"]}
+    relations = [relation for relation in scheme["relations"] if _get_relation_key(relation) not in stale_relations]
+
+    referenced = {concept_id for relation in relations for concept_id in (relation["from_concept"],
+                                                                          relation["to_concept"])}
+    stale_concepts = {concept_id for update in stale for concept_id in update["concepts"]} - referenced
+    concepts = [concept for concept in scheme["concepts"] if concept["concept_id"] not in stale_concepts]
+
+    return {**scheme, "concepts": concepts, "relations": relations}, [update for update in updates
+                                                                       if update not in stale]
+
+
+def merge_summaries(summary: Optional[Dict], addition: Optional[Dict]) -> Optional[Dict]:
+    """extends the main concepts and relations of the summary-object by those of the summary of an update"""
+    if summary is None or addition is None:
+        return summary or addition
+
+    main_concepts = list(dict.fromkeys(summary["main_concepts"] + addition["main_concepts"]))
+    relations = list(dict.fromkeys(summary["relations"] + addition["relations"]))
+
+    return {**summary, "main_concepts": main_concepts, "relations": relations}
+
+
+async def aupdate_scheme(llm: BaseLLM, scheme: Dict, source: Dict, text: str, context: str, text_type: str,
+                         nr_concepts: int, progress: ProgressReporter) -> Tuple[Optional[Dict], Dict, Dict]:
+    """updates the scheme generated from the source text to the given (appended or edited) text. Only the added
+    paragraphs are summarized and extracted, so the costs are proportional to the edit. Returns the summary-object of
+    the added paragraphs (None if there are none or for one-shot maps), the updated scheme and the updated source."""
+    added, removed = diff_paragraphs(source["text"], text)
+    progress.emit("diff", added_paragraphs=len(added), removed_paragraphs=len(removed))
+
+    scheme, updates = remove_stale_updates(scheme, source.get("updates", []), text)
+    summary_obj = None
+
+    if added:
+        added_text = "\n\n".join(added)
+
+        if context == "mathematical":
+            # one-shot maps have no summary, the added text is extracted directly
+            information = added_text
+        else:
+            # the number of new concepts is bounded by the share of the edit within the text
+            nr_added_concepts = max(2, min(nr_concepts, math.ceil(nr_concepts * len(added_text) / len(text))))
+
+            with progress.stage("summarization", llm):
+                summary_obj = await asummarize_text(llm, added_text, text_type, nr_added_concepts)
+
+            progress.emit("summary", summary=summary_obj)
+            information = json.dumps(summary_obj)
+
+        prompt, parser = get_update_extraction_prompt()
+
+        with progress.stage("extraction", llm):
+            addition = await llm.agenerate(prompt, parser=parser, params={
+                "input": information,
+                "concepts": "\n".join(f"- {concept['concept_id']}: {get_concept_name(concept)}"
+                                      for concept in scheme["concepts"])
+            })
+
+        scheme, contribution = merge_scheme(scheme, addition, added)
+        updates = updates + [contribution]
+
+    return summary_obj, scheme, {"text": text, "updates": updates}
+
+
+def _get_relation_key(relation: Dict) -> Tuple[str, str, str]:
+    return relation["from_concept"], relation["to_concept"], " ".join(str(relation["predicate"]).lower().split())
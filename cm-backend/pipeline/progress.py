@@ -0,0 +1,98 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import AsyncIterator, Dict, Optional
+
+from metrics.prometheus_metrics import stage_duration
+
+
+class ProgressReporter:
+    """Collects the progress events of a single concept map generation (stage starts and ends, intermediate results)
+    and streams them to any number of subscribers. Events may be emitted from the event loop or from worker threads."""
+
+    def __init__(self):
+        self.events = []
+        self.closed = False
+
+        self._subscribers = []
+        self._lock = Lock()
+
+    def emit(self, event: str, **data):
+        """records an event and forwards it to all subscribers"""
+        entry = {"event": event, "time": time.time(), **data}
+
+        with self._lock:
+            self.events.append(entry)
+            subscribers = list(self._subscribers)
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, entry)
+
+    def close(self):
+        """marks the generation as finished, subscriptions end after the last event"""
+        with self._lock:
+            self.closed = True
+            subscribers = list(self._subscribers)
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    @contextmanager
+    def stage(self, name: str, llm=None):
+        """emits start and end events (with duration and, if an llm is given, its token usage) around a stage. The
+        duration is recorded within the stage latency metrics, too."""
+        usage_before = dict(llm.usage) if llm else None
+        start = time.perf_counter()
+        failed = True
+
+        self.emit("stage_start", stage=name)
+
+        try:
+            yield
+            failed = False
+        finally:
+            duration = time.perf_counter() - start
+            stage_duration.observe(duration, stage=name, model=getattr(llm, "model_name", ""))
+
+            self.emit("stage_end", stage=name, duration_s=duration, failed=failed,
+                      usage=_usage_delta(llm, usage_before))
+
+    async def subscribe(self) -> AsyncIterator[Dict]:
+        """yields all past and future events until the generation is finished"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        with self._lock:
+            history = list(self.events)
+            closed = self.closed
+
+            if not closed:
+                self._subscribers.append((loop, queue))
+
+        try:
+            for entry in history:
+                yield entry
+
+            if closed:
+                return
+
+            while True:
+                entry = await queue.get()
+
+                if entry is None:
+                    return
+
+                yield entry
+        finally:
+            with self._lock:
+                if (loop, queue) in self._subscribers:
+                    self._subscribers.remove((loop, queue))
+
+
+def _usage_delta(llm, usage_before: Optional[Dict]) -> Optional[Dict]:
+    """Helper-function returning the tokens used by the llm since the given usage snapshot"""
+    if llm is None:
+        return None
+
+    return {key: llm.usage[key] - usage_before.get(key, 0) for key in llm.usage}
@@ -0,0 +1,118 @@
+import re
+from typing import Dict, List
+
+from llm.models import BaseLLM
+from pipeline.chunking import split_text
+from pipeline.executor import run_blocking
+from prompts.summarization import get_default_summary_prompt
+
+# maximum number of chunk summaries requested from the llm at the same time
+MAX_CONCURRENT_CHUNKS = 8
+
+_word_pattern = re.compile(r"\w+")
+
+
+def summarize_text(llm: BaseLLM, text: str, text_type: str, nr_concepts: int) -> Dict:
+    """generates a summary-object for the given text. Texts exceeding the token budget of the llm are split into
+    chunks, which are summarized concurrently and reduced into a single summary-object afterwards."""
+    summary_prompt, summary_parser = get_default_summary_prompt()
+    chunks = split_text(text, llm)
+
+    if len(chunks) == 1:
+        return llm.generate(summary_prompt, parser=summary_parser, params={
+            "input": text,
+            "text_type": text_type,
+            "nr_concepts": nr_concepts
+        })
+
+    summaries = llm.generate_batch(summary_prompt, parser=summary_parser, max_concurrency=MAX_CONCURRENT_CHUNKS,
+                                   params=[{
+                                       "input": chunk,
+                                       "text_type": text_type,
+                                       "nr_concepts": nr_concepts
+                                   } for chunk in chunks])
+
+    return reduce_summaries(summaries, nr_concepts)
+
+
+async def asummarize_text(llm: BaseLLM, text: str, text_type: str, nr_concepts: int) -> Dict:
+    """asynchronous version of summarize_text (tokenization for chunking is run outside the event loop)"""
+    summary_prompt, summary_parser = get_default_summary_prompt()
+    chunks = await run_blocking(split_text, text, llm)
+
+    if len(chunks) == 1:
+        return await llm.agenerate(summary_prompt, parser=summary_parser, params={
+            "input": text,
+            "text_type": text_type,
+            "nr_concepts": nr_concepts
+        })
+
+    summaries = await llm.agenerate_batch(summary_prompt, parser=summary_parser,
+                                          max_concurrency=MAX_CONCURRENT_CHUNKS,
+                                          params=[{
+                                              "input": chunk,
+                                              "text_type": text_type,
+                                              "nr_concepts": nr_concepts
+                                          } for chunk in chunks])
+
+    return reduce_summaries(summaries, nr_concepts)
+
+
+def reduce_summaries(summaries: List[Dict], nr_concepts: int) -> Dict:
+    """reduces the summary-objects of several chunks into a single summary-object. Concepts are ranked by the number
+    of chunks mentioning them (ties are broken by their best position within a chunk) and only the nr_concepts highest
+    ranked concepts are kept together with the relations referring to them."""
+    if len(summaries) == 1:
+        return summaries[0]
+
+    # rank concepts over all chunks
+    concept_names = {}
+    concept_scores = {}
+
+    for summary in summaries:
+        for position, concept in enumerate(summary.get("main_concepts", [])):
+            key = concept.strip().casefold()
+            if not key:
+                continue
+
+            concept_names.setdefault(key, concept.strip())
+            count, best_position = concept_scores.get(key, (0, position))
+            concept_scores[key] = (count + 1, min(best_position, position))
+
+    ranking = sorted(concept_scores.keys(), key=lambda k: (-concept_scores[k][0], concept_scores[k][1]))
+    main_concepts = ranking[:nr_concepts]
+
+    # keep the (deduplicated) relations mentioning at least one of the remaining concepts as whole words (so "ai"
+    # doesn't match "maintain")
+    relations = []
+    seen_relations = set()
+    concept_words = [words for words in map(_get_words, main_concepts) if words.strip()]
+
+    for summary in summaries:
+        for relation in summary.get("relations", []):
+            key = relation.strip().casefold()
+            words = _get_words(key)
+            if key in seen_relations or not any(concept in words for concept in concept_words):
+                continue
+
+            seen_relations.add(key)
+            relations.append(relation.strip())
+
+    return {
+        "title": summaries[0].get("title", ""),
+        "summary": " ".join(_unique(summary.get("summary", "") for summary in summaries)),
+        "importance": " ".join(_unique(summary.get("importance", "") for summary in summaries)),
+        "focusing_question": summaries[0].get("focusing_question", ""),
+        "main_concepts": [concept_names[key] for key in main_concepts],
+        "relations": relations
+    }
+
+
+def _get_words(text: str) -> str:
+    """Helper-function returning the words of the text separated and enclosed by single spaces"""
+    return " " + " ".join(_word_pattern.findall(text)) + " "
+
+
+def _unique(texts) -> List[str]:
+    """Helper-function returning the non-empty texts without duplicates (preserving their order)"""
+    return list(dict.fromkeys(text.strip() for text in texts if text and text.strip()))
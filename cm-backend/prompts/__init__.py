@@ -0,0 +1,3 @@
+# version of the prompts used for concept map generation, increase it whenever a prompt changes (invalidates cached
+# results generated with the previous prompts)
+PROMPT_VERSION = 2
@@ -4,6 +4,8 @@ from langchain_core.output_parsers import BaseOutputParser, JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
+from prompts.prompt_layout import create_prompt
+
 
 class Concept(BaseModel):
     concept_id: str = Field(description="the identifier of the concept")
@@ -27,11 +29,8 @@ class ConceptMap(BaseModel):
 def get_default_extraction_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
     parser = JsonOutputParser(pydantic_object=ConceptMap)
 
-    prompt = ChatPromptTemplate(
-        [
-            (
-                "system",
-                """You are a data scientist and expert in concept mapping working for a company that is building graph 
+    prompt = create_prompt(
+        """You are a data scientist and expert in concept mapping working for a company that is building graph 
                 databases, knowledge graphs and concept maps. Your task is to examine a previously generated JSON, that 
                 summarizes the  subject and importance of a text focussing on an arbitrary topic, and convert it into a 
                 structured (also JSON) collection of concepts and relations that will be transformed into a concept 
@@ -107,13 +106,70 @@ def get_default_extraction_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParse
                     }}
                   ]
                 }}"""
-            ),
-            (
-                "human",
-                "{input}"
-            )
-        ],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+
+    return prompt, parser
+
+
+def get_update_extraction_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
+    """returns the prompt extending an existing concept map by the information of an added or edited part of the text
+    (given as summary-object or, for one-shot maps, as text)"""
+    parser = JsonOutputParser(pydantic_object=ConceptMap)
+
+    prompt = create_prompt(
+        """You are a data scientist and expert in concept mapping working for a company that is building graph
+                databases, knowledge graphs and concept maps. An existing concept map has been built from a text, which
+                has been extended or edited since. Your task is to examine the new information (a JSON-summary of the
+                added or edited part of the text, or the part itself) and convert it into a structured (also JSON)
+                collection of concepts and relations that will be added to the existing concept map. The concepts of
+                the existing concept map are given in front of the new information.
+
+                Your output must contain:
+                - A "concepts" set, where each element is a JSON object with:
+                  * "concept_id": A UNIQUE identifier for the concept. If the concept is already part of the existing
+                  concept map, you MUST use its existing concept id.
+                  * "type": A generic type/category for the concept.
+                  * "properties": A JSON object containing AT LEAST a "name" property. Add other suitable and
+                  concise (no descriptions or sentences) properties with respect to the concept.
+                - A "relations" array, where each element is a JSON object with:
+                  * "from_concept": The concept id of the relations subject/source concept.
+                  * "to_concept": The concept id of the relations object/target concept.
+                  * "predicate": A SHORT predicative expression describing the relation. Should not contain more than
+                  three words!
+                  * "properties": A JSON object containing suitable and concise (no descriptions or sentences)
+                  properties that clarify the relation between the two mentioned concepts.
+
+                Important details:
+                - Only add concepts and relations that are mentioned by the new information. Do not repeat relations
+                of the existing concept map.
+                - "from_concept" and "to_concept" within a relation must either be listed in your "concepts" set or
+                be concept ids of the existing concept map. Otherwise don´t add the relation!
+                - Connect every new concept to the existing concept map, either through direct relations or
+                indirectly via other new concepts, so the concept map remains a single connected graph!
+                - For bidirectional relationships, provide a separate relation object for each of the two directions!
+                - Prioritize representing information as concepts and relations over storing it in properties.
+
+                Example for expected output format:
+                {{
+                  "concepts": [
+                    {{
+                      "concept_id": "concept_c",
+                      "type": "entity",
+                      "properties": {{
+                        "name": "Concept C"
+                      }}
+                    }}
+                  ],
+                  "relations": [
+                    {{
+                      "from_concept": "concept_c",
+                      "to_concept": "existing_concept_a",
+                      "predicate": "extends",
+                      "properties": {{}}
+                    }}
+                  ]
+                }}""",
+        human="Concepts of the existing concept map:\n{concepts}\n\nNew information:\n{input}"
     )
 
     return prompt, parser
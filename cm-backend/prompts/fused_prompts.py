@@ -0,0 +1,99 @@
+from typing import Tuple
+
+from langchain_core.output_parsers import BaseOutputParser, JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
+
+from prompts.concept_extraction import ConceptMap
+from prompts.prompt_layout import create_prompt
+from prompts.summarization import Summary
+
+
+class SummarizedConceptMap(BaseModel):
+    summary: Summary = Field(description="the summary-object of the input text")
+    concept_map: ConceptMap = Field(description="the concept map built from the summary-object")
+
+
+def get_fused_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
+    """returns the prompt generating the summary-object and the concept map of a text within a single call (combines
+    the default summary prompt and the default extraction prompt)"""
+    parser = JsonOutputParser(pydantic_object=SummarizedConceptMap)
+
+    prompt = create_prompt(
+        """You are an expert reader and data scientist, that creates concept maps from texts. Your task is to examine
+                a given text focussing on an arbitrary topic in two steps. First extract its essence into a
+                JSON-formatted summary, then convert this summary into a structured (also JSON) collection of concepts
+                and relations that will be transformed into a concept map. As an expert, you must decide why the
+                given subject matters, and focus on presenting concepts and relations that highlight its importance.
+
+                The type of the text and the maximum number of main concepts are given in front of the text. The
+                text will be the main source of information. Treat every information in the text as factual.
+
+                Follow these instructions carefully and strictly:
+                - The output MUST be valid JSON.
+                - The output MUST contain the fields "summary" and "concept_map" and no others.
+                - "summary" MUST contain the following fields and no others:
+                    * "title": A good fitting title for the summary.
+                    * "summary": A concise summary of the input text, capturing the most important ideas mentioned in
+                    the text.
+                    * "importance": A short discussion why this subject matters.
+                    * "focusing_question": A dynamic focusing question, that clearly specifies the problem or issue the
+                    concept map should help to resolve.
+                    * "main_concepts": A set containing up to the maximum number of the MOST IMPORTANT concepts
+                    of the text in order of importance. Concepts can represent real entities (e.g. persons,
+                    organizations, etc.) or more abstract concepts (e.g. technologies, ideas, approaches, roadmaps,
+                    theories, etc.) usually mentioned as a common or proper noun that is a key element of the text.
+                    Be aware that the maximum number is an upper bound, DONT add irrelevant concepts!
+                    * "relations": A list containing sentences that describe how each concept in the MAIN CONCEPTS set
+                    relates to each of the other concepts in that set. Each sentence MUST feature two distinct
+                    concepts from the MAIN CONCEPTS set. For bidirectional relations provide one relation for each
+                    of the two directions. Focus on finding as many meaningful relations as possible!
+                - "concept_map" MUST contain:
+                    * A "concepts" set, where each element is a JSON object with a UNIQUE "concept_id", a generic
+                    "type" and "properties", a JSON object containing AT LEAST a "name" property. Add other suitable
+                    and concise (no descriptions or sentences) properties with respect to the concept. Every main
+                    concept of the summary MUST be listed as a concept.
+                    * A "relations" array, where each element is a JSON object with "from_concept" and "to_concept"
+                    (the concept ids of the subject and the object, listed in the "concepts" set), a SHORT "predicate"
+                    of at most three words and "properties", a JSON object containing suitable and concise properties
+                    of the relation. Each relation of the summary should result in one or more corresponding
+                    relations, similar relations with the same direction are united into a single relation. Further
+                    add important relations between the concepts that remain unmentioned in the summary.
+                - Further restrictions:
+                    * Do not mention given references.
+                    * Do not mention the authors of the text nor the institution they are working for.
+                    * If you can't pair both concept ids of a relation with concepts listed in the "concepts" set,
+                    don´t add it!
+                    * Prioritize representing information as concepts and relations over storing it in properties.
+
+                Remember, your task is to build a clear concept map, so all found concepts and relations
+                must result in a single connected graph, where each concept-node is somehow connected to each other,
+                either through direct relations or indirectly via related concepts!
+
+                Example for expected output format:
+                {{
+                  "summary": {{
+                    "title": "...",
+                    "summary": "...",
+                    "importance": "...",
+                    "focusing_question": "...",
+                    "main_concepts": ["Concept A", "Concept B"],
+                    "relations": ["Concept A supports Concept B by ...", "Concept B builds upon Concept A ..."]
+                  }},
+                  "concept_map": {{
+                    "concepts": [
+                      {{"concept_id": "concept_a", "type": "entity", "properties": {{"name": "Concept A"}}}},
+                      {{"concept_id": "concept_b", "type": "idea", "properties": {{"name": "Concept B"}}}}
+                    ],
+                    "relations": [
+                      {{"from_concept": "concept_a", "to_concept": "concept_b", "predicate": "supports",
+                        "properties": {{}}}},
+                      {{"from_concept": "concept_b", "to_concept": "concept_a", "predicate": "builds upon",
+                        "properties": {{}}}}
+                    ]
+                  }}
+                }}""",
+        human="Type of the text: {text_type}\nMaximum number of main concepts: {nr_concepts}\n\n{input}"
+    )
+
+    return prompt, parser
@@ -4,6 +4,9 @@ from langchain_core.output_parsers import BaseOutputParser, JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
+from prompts.examples import get_default_example, get_mathematical_example
+from prompts.prompt_layout import create_prompt
+
 
 class Concept(BaseModel):
     concept_id: str = Field(description="the identifier of the concept")
@@ -28,11 +31,8 @@ def get_default_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
     parser = JsonOutputParser(pydantic_object=ConceptMap)
 
     # Prompt inspired by neo4js NaLLM-project, see https://github.com/neo4j/NaLLM.
-    prompt = ChatPromptTemplate(
-        [
-            (
-                "system",
-                """You are a data scientist working for a company that is building a concept map. Your task is to 
+    prompt = create_prompt(
+        """You are a data scientist working for a company that is building a concept map. Your task is to 
                 extract the main ideas from an unstructured text and convert it into a structured (json) collection 
                 of concepts and relations, that will later be transformed into a graph database. Therefore, 
                 first provide a set of concepts where each concept has an CONCEPT_ID, TYPE and PROPERTIES attribute. 
@@ -53,14 +53,8 @@ def get_default_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
                 either through direct relations or indirectly via related concepts!
                 
                 {example}
-                """
-            ),
-            (
-                "human",
-                "{input}"
-            )
-        ],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
+                """,
+        example=get_default_example()
     )
 
     return prompt, parser
@@ -69,11 +63,8 @@ def get_default_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
 def get_scientific_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
     parser = JsonOutputParser(pydantic_object=ConceptMap)
 
-    prompt = ChatPromptTemplate(
-        [
-            (
-                "system",
-                """You are a data scientist working at an university as an scientific assistant. One of your jobs is 
+    prompt = create_prompt(
+        """You are a data scientist working at an university as an scientific assistant. One of your jobs is 
                 to create concept maps that clearly depict complex topics to the students of your faculty. You will 
                 therefore be provided with unstructured text (e.g. a scientific paper, abstract, article, 
                 etc.) focussing on a specific scientific topic. Your task is to extract the main ideas from this text 
@@ -100,14 +91,8 @@ def get_scientific_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
                 Use the following example to understand the expected output scheme. However, do not base your 
                 methodology on the provided example, since it doesnt reflect any scientific claims. 
                 
-                {example}"""
-            ),
-            (
-                "human",
-                "{input}"
-            )
-        ],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
+                {example}""",
+        example=get_default_example()
     )
 
     return prompt, parser
@@ -116,11 +101,8 @@ def get_scientific_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
 def get_wiki_text_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
     parser = JsonOutputParser(pydantic_object=ConceptMap)
 
-    prompt = ChatPromptTemplate(
-        [
-            (
-                "system",
-                """You are a data scientist and journalist working for an agency, that creates visualizations for 
+    prompt = create_prompt(
+        """You are a data scientist and journalist working for an agency, that creates visualizations for 
                 magazines and journals. Your job is to create concept maps that clearly depict different topics to 
                 the readers of this journals. You will therefore be provided with unstructured wiki-text (e.g. 
                 scraped text from wikipedia) focussing on a specific topic. Your task is to extract the main ideas 
@@ -147,14 +129,8 @@ def get_wiki_text_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
                 methodology on the provided example, since it doesnt reflect a wiki text but rather a simpler toy 
                 example.
                 
-                {example}"""
-            ),
-            (
-                "human",
-                "{input}"
-            )
-        ],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
+                {example}""",
+        example=get_default_example()
     )
 
     return prompt, parser
@@ -163,11 +139,8 @@ def get_wiki_text_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
 def get_mathematical_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
     parser = JsonOutputParser(pydantic_object=ConceptMap)
 
-    prompt = ChatPromptTemplate(
-        [
-            (
-                "system",
-                """You are an mathematician and data scientist working at an university as an scientific assistant 
+    prompt = create_prompt(
+        """You are an mathematician and data scientist working at an university as an scientific assistant 
                 within the faculty of mathematics. One of your jobs is to create concept maps that clearly depict 
                 complex mathematical relationships to the students of your faculty. You will therefore be provided 
                 with unstructured text (e.g. a scientific paper, article, etc) focussing on a specific topic and 
@@ -197,14 +170,8 @@ def get_mathematical_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
                 either through direct relations or indirectly via related concepts!
                 
                 {example}
-                """
-            ),
-            (
-                "human",
-                "{input}"
-            )
-        ],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
+                """,
+        example=get_mathematical_example()
     )
 
     return prompt, parser
@@ -0,0 +1,27 @@
+import inspect
+
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+
+def normalize_instructions(text: str) -> str:
+    """removes the indentation and trailing whitespace of a triple-quoted prompt text"""
+    return "\n".join(line.rstrip() for line in inspect.cleandoc(text).splitlines())
+
+
+def create_prompt(system: str, human: str = "{input}", **partial_variables) -> ChatPromptTemplate:
+    """returns a prompt consisting of a static system message followed by the human message carrying all per-call
+    variables. The system message may only contain the given partial variables, so it is byte-identical for every
+    call and providers can cache it as a common prefix (e.g. openai caches prefixes of at least 1024 tokens)."""
+    system = normalize_instructions(system)
+    variables = set(PromptTemplate.from_template(system).input_variables) - set(partial_variables)
+
+    if variables:
+        raise ValueError(f"The system message must be static, but contains the variables {sorted(variables)}")
+
+    return ChatPromptTemplate(
+        [
+            ("system", system),
+            ("human", human)
+        ],
+        partial_variables=partial_variables
+    )
@@ -5,6 +5,8 @@ from langchain_core.output_parsers import BaseOutputParser, JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
+from prompts.prompt_layout import create_prompt
+
 
 class SummaryTest(BaseModel):
     title: str               = Field(description="a title for the summary")
@@ -118,49 +120,47 @@ def get_default_summary_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
     parser = JsonOutputParser(pydantic_object=Summary)
 
     # Prompt inspired by jorgearangos llmapper-project, see https://github.com/jorgearango/llmapper.
-    prompt = ChatPromptTemplate(
-        [
-            (
-                "system",
-                """You are an expert reader, that helps creating summaries of {text_type}. Your task is to examine 
+    prompt = create_prompt(
+        """You are an expert reader, that helps creating summaries of texts. Your task is to examine 
                 a given text focussing on an arbitrary topic, extract its essence, and produce a JSON-formatted summary 
                 that will serve as a basis for the creation of a concept map. This concept map should depict the main 
                 ideas of the given text in the form of concepts and relations. As an expert, you must decide why the 
                 given subject matters, and focus on presenting concepts and relation that highlight its importance. 
                 
-                The {text_type} will be the main source of information for your outline. Treat every information in the 
-                text as factual.  
+                The type of the text and the maximum number of main concepts are given in front of the text. The 
+                text will be the main source of information for your outline. Treat every information in the text as 
+                factual.  
                 
                 Follow these instructions carefully and strictly:
                 - The output MUST be valid JSON.
                 - The output MUST contain the following fields and no others:
                     * "title": A good fitting title for the summary.
                     * "summary": A concise summary of the input text, capturing the most important ideas mentioned in 
-                    the {text_type}.
+                    the text.
                     * "importance": A short discussion why this subject matters.
                     * "focusing_question": A dynamic focusing question, that clearly specifies the problem or issue the 
                     concept map should help to resolve.
-                    * "main_concepts": A set containing up to {nr_concepts} of the MOST IMPORTANT concepts of 
-                    the {text_type} in order of importance. Concepts can represent real entities (e.g. persons, 
+                    * "main_concepts": A set containing up to the maximum number of the MOST IMPORTANT concepts 
+                    of the text in order of importance. Concepts can represent real entities (e.g. persons, 
                     organizations, etc.) or more abstract concepts (e.g. technologies, ideas, approaches, roadmaps, 
                     theories, etc.) usually  mentioned as a common or proper noun that is a key element of the 
-                    {text_type}. The most important concepts are those that help explain what the subject of the text is 
+                    text. The most important concepts are those that help explain what the subject of the text is 
                     about and why it matters — concepts that help answering the focusing question. 
                     * "relations": A list containing sentences that describe how each concept in the MAIN CONCEPTS set 
                     relates to each of the other concepts in that set. Each sentence MUST feature two distinct 
                     concepts, except relations, that describe how concepts are related to themselves. It is important 
                     that you ONLY USE CONCEPTS FROM THE CONCEPTS SET. Do not introduce new concepts. Only include one 
                     object and one subject in each sentence. For bidirectional relations provide one relation for each 
-                    of the two directions. Include relations that help explain why the subject of the {text_type}
+                    of the two directions. Include relations that help explain why the subject of the text
                     matters. You should at least include enough relations to represent ALL the concepts in the concept
                     set. However, more relations with a large variance of associated concepts will result in better 
                     concept map, so focus on finding as many meaningful relations as possible!
                 - Further restrictions:        
                     * Do not mention given references.
-                    * Do not mention the authors of the {text_type} nor the institution they are working for.
-                    * Be aware that {nr_concepts} is an upper bound for the number of concepts! If you believe that 
-                    there are less than {nr_concepts} concepts which are relevant for understanding the subject, DONT 
-                    introduce new or add irrelevant concepts to the main_concepts!
+                    * Do not mention the authors of the text nor the institution they are working for.
+                    * Be aware that the maximum number of main concepts is an upper bound for the number of 
+                    concepts! If you believe that there are less concepts which are relevant for understanding the 
+                    subject, DONT introduce new or add irrelevant concepts to the main_concepts!
 
                 For example:
                 {{
@@ -175,14 +175,8 @@ def get_default_summary_prompt() -> Tuple[ChatPromptTemplate, BaseOutputParser]:
                     "ConceptC started ConceptA on..."
                   ]
                 }}
-                """
-            ),
-            (
-                "human",
-                "{input}"
-            )
-        ],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
+                """,
+        human="Type of the text: {text_type}\nMaximum number of main concepts: {nr_concepts}\n\n{input}"
     )
 
     return prompt, parser
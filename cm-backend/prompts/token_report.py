@@ -0,0 +1,96 @@
+#! /usr/bin/env python
+"""
+Report of the token budget of every prompt. Each prompt is split into its static part (the system message, which is
+byte-identical for every call and can be served from the providers prompt cache) and its dynamic part (the human
+message without the input). The static share is reported for inputs of the given sizes, since static tokens dominate
+the costs of short inputs.
+
+Usage: python -m prompts.token_report [--model gpt-4o] [--input-tokens 250,1000,4000] [--json]
+"""
+import argparse
+import json
+from typing import Callable, Dict, List
+
+from llm.tokenizers import count_mistral_tokens, count_openai_tokens
+from prompts.concept_extraction import get_default_extraction_prompt, get_update_extraction_prompt
+from prompts.fused_prompts import get_fused_prompt
+from prompts.one_shot_prompts import get_default_prompt, get_mathematical_prompt, get_scientific_prompt, \
+    get_wiki_text_prompt
+from prompts.summarization import get_default_summary_prompt
+
+# minimum length of a prefix cached by openai
+CACHE_MIN_TOKENS = 1024
+
+# prompts and the per-call variables (besides the input) they are used with
+PROMPTS = {
+    "summary": (get_default_summary_prompt, [{"text_type": "text", "nr_concepts": 12},
+                                             {"text_type": "scientific text", "nr_concepts": 32}]),
+    "extraction": (get_default_extraction_prompt, [{}]),
+    "update_extraction": (get_update_extraction_prompt, [{"concepts": "- c0: Concept A"},
+                                                         {"concepts": "- c0: Concept A\n- c1: Concept B"}]),
+    "fused": (get_fused_prompt, [{"text_type": "text", "nr_concepts": 12},
+                                 {"text_type": "scientific text", "nr_concepts": 32}]),
+    "one_shot_default": (get_default_prompt, [{}]),
+    "one_shot_scientific": (get_scientific_prompt, [{}]),
+    "one_shot_wiki_text": (get_wiki_text_prompt, [{}]),
+    "one_shot_mathematical": (get_mathematical_prompt, [{}])
+}
+
+
+def count_tokens(model_name: str, strings: List[str]) -> List[int]:
+    if "mistral" in model_name:
+        return count_mistral_tokens(strings)
+
+    return count_openai_tokens(model_name, strings)
+
+
+def create_prompt_report(get_prompt: Callable, variants: List[Dict], model_name: str,
+                         input_tokens: List[int]) -> Dict:
+    """returns the static and dynamic token counts of the prompt. The static part is checked to be identical for all
+    given variants of per-call variables."""
+    prompt, _ = get_prompt()
+    formatted = [prompt.format_messages(input="", **params) for params in variants]
+
+    static = formatted[0][0].content
+    dynamic = formatted[0][1].content
+    static_tokens, dynamic_tokens = count_tokens(model_name, [static, dynamic])
+
+    return {
+        "static_tokens": static_tokens,
+        "dynamic_tokens": dynamic_tokens,
+        "static_identical": all(messages[0].content == static for messages in formatted),
+        "cacheable": static_tokens >= CACHE_MIN_TOKENS,
+        "static_share": {n: static_tokens / (static_tokens + dynamic_tokens + n) for n in input_tokens}
+    }
+
+
+def create_report(model_name: str, input_tokens: List[int]) -> Dict:
+    return {name: create_prompt_report(get_prompt, variants, model_name, input_tokens)
+            for name, (get_prompt, variants) in PROMPTS.items()}
+
+
+def print_report(report: Dict, input_tokens: List[int]):
+    shares = "".join(f" {f'share@{n}':>11}" for n in input_tokens)
+    print(f"{'prompt':<22} {'static':>7} {'dynamic':>8} {'identical':>9} {'cacheable':>9}{shares}")
+
+    for name, result in report.items():
+        shares = "".join(f" {result['static_share'][n]:>11.1%}" for n in input_tokens)
+        print(f"{name:<22} {result['static_tokens']:>7} {result['dynamic_tokens']:>8} "
+              f"{str(result['static_identical']):>9} {str(result['cacheable']):>9}{shares}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Static and dynamic token counts of the prompts")
+    parser.add_argument("--model", default="gpt-4o", help="model whose tokenizer is used")
+    parser.add_argument("--input-tokens", default="250,1000,4000",
+                        help="comma-separated input sizes (in tokens) the static share is reported for")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    arguments = parser.parse_args()
+
+    sizes = [int(size) for size in arguments.input_tokens.split(",")]
+    token_report = create_report(arguments.model, sizes)
+
+    if arguments.json:
+        print(json.dumps(token_report, indent=2))
+    else:
+        print_report(token_report, sizes)
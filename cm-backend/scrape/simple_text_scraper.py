@@ -1,33 +1,112 @@
-from bs4 import BeautifulSoup
-from bs4.element import Comment
-from urllib import request
+import asyncio
+import os
+from threading import Lock
 
+import httpx
+import lxml.html
+from lxml import etree
 
-def tag_visible(element):
-    if element.parent.name in ['style', 'script', 'head', 'title', 'meta', '[document]']:
-        return False
+from pipeline.executor import run_blocking
 
-    if isinstance(element, Comment):
-        return False
+# tags whose content is not visible on the website (their subtrees are skipped during extraction)
+invisible_tags = ["style", "script", "head", "title", "meta", "noscript", "template", "svg"]
 
-    return True
+# content types that can be processed
+valid_content_types = ["text/html", "application/xhtml+xml", "text/plain"]
 
+# timeouts in seconds (connecting, waiting for data and the whole download)
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+TOTAL_TIMEOUT = 30
 
-def text_from_html(body):
-    """returns the visible text from the given html body without tags"""
+_async_client = None
+_client_lock = Lock()
+
+
+class ScrapeError(Exception):
+    """Raised if a website can't be scraped (wrong content type, too large, ...)"""
+
+
+def get_max_body_bytes() -> int:
+    """returns the maximum size of a scraped website (environment variable CM_SCRAPE_MAX_MB, default: 5 MB)"""
+    return int(float(os.getenv("CM_SCRAPE_MAX_MB") or 5) * 2 ** 20)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """returns the shared async http client used for scraping"""
+    global _async_client
+
+    with _client_lock:
+        if _async_client is None:
+            _async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=int(os.getenv("CM_SCRAPE_MAX_CONNECTIONS") or 20)),
+                follow_redirects=True,
+                headers={"User-Agent": "concept-mapper"}
+            )
+
+    return _async_client
+
+
+def _check_response(response: httpx.Response) -> str:
+    """checks status, content type and announced size of the response and returns its content type"""
+    response.raise_for_status()
+
+    content_type = response.headers.get("content-type", "text/html").split(";")[0].strip().lower()
+    if content_type not in valid_content_types:
+        raise ScrapeError(f"Content type {content_type} not supported. Provide the url of a website!")
+
+    content_length = response.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > get_max_body_bytes():
+        raise ScrapeError("Website too large!")
 
-    soup = BeautifulSoup(body, 'html.parser')
+    return content_type
 
-    # find all strings on website
-    texts = soup.find_all(string=True)
 
-    # filter unvisible strings
-    visible_texts = filter(tag_visible, texts)
+def _append_chunk(body: bytearray, chunk: bytes):
+    """appends the chunk to the body, unless the maximum size is exceeded (servers may announce wrong sizes)"""
+    body += chunk
+
+    if len(body) > get_max_body_bytes():
+        raise ScrapeError("Website too large!")
+
+
+def text_from_html(body: bytes) -> str:
+    """returns the visible text from the given html body without tags"""
+    try:
+        document = lxml.html.document_fromstring(body)
+    except etree.ParserError:
+        # empty document
+        return ""
+
+    # drop invisible subtrees and comments (keeping the text following them)
+    etree.strip_elements(document, etree.Comment, *invisible_tags, with_tail=False)
 
     # remove excessive whitespace and join the texts
-    return u' '.join(t.strip() for t in visible_texts)
+    return u' '.join(text.strip() for text in document.itertext() if text.strip())
+
+
+def _text_from_body(body: bytes, content_type: str, encoding: str) -> str:
+    if content_type == "text/plain":
+        return body.decode(encoding or "utf-8", errors="replace")
+
+    return text_from_html(bytes(body))
+
+
+async def ascrape_visible_text(url: str) -> str:
+    """scrapes the visible text from the website with the given url. The download is limited to TOTAL_TIMEOUT seconds
+    and the (cpu-bound) parsing is executed outside the event loop."""
+    async def download():
+        body = bytearray()
+
+        async with get_async_client().stream("GET", url) as response:
+            content_type = _check_response(response)
+
+            async for chunk in response.aiter_bytes():
+                _append_chunk(body, chunk)
+
+        return body, content_type, response.encoding
 
+    body, content_type, encoding = await asyncio.wait_for(download(), TOTAL_TIMEOUT)
 
-def scrape_visible_text(url: str) -> str:
-    """scrapes the visible text from the website with the given url"""
-    return text_from_html(request.urlopen(url).read())
+    return await run_blocking(_text_from_body, body, content_type, encoding)
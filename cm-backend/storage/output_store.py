@@ -0,0 +1,205 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+from collections import OrderedDict
+from threading import Lock, Thread
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# name of the journal within the output directory, every change of the stored maps is appended as a single line
+JOURNAL_NAME = ".index.log"
+
+
+class OutputStore:
+    """Stores the artifacts of every concept map within its own directory (named by the unique id of the map). JSON
+    artifacts are written gzip-compressed. A compact index of the stored maps (creation time and size) is kept in
+    memory and persisted as an append-only journal, so maps exceeding the retention time (ttl_seconds) or the total
+    size limit (max_bytes, oldest first) are evicted without walking the directory tree."""
+
+    def __init__(self, root: str, ttl_seconds: float = 0, max_bytes: int = 0):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._maps: "OrderedDict[str, List]" = OrderedDict()      # map id -> [creation time, bytes], oldest first
+        self._total_bytes = 0
+        self._journal_lines = 0
+        self._lock = Lock()
+        self._evictor = None
+
+        os.makedirs(root, exist_ok=True)
+        self._load_journal()
+
+    def get_path(self, map_id: str) -> str:
+        """returns the directory of the map with the given id"""
+        return os.path.join(self.root, map_id)
+
+    def contains(self, map_id: str) -> bool:
+        return os.path.isdir(self.get_path(map_id))
+
+    def list_files(self, map_id: str) -> List[str]:
+        """returns the names of the files stored for the map with the given id"""
+        return os.listdir(self.get_path(map_id)) if self.contains(map_id) else []
+
+    def write_json(self, map_id: str, name: str, obj) -> str:
+        """stores the given object as compressed JSON (<name>.json.gz) and returns the path of the file"""
+        return self.write_bytes(map_id, f"{name}.json.gz", gzip.compress(json.dumps(obj).encode("utf-8"),
+                                                                         compresslevel=6))
+
+    def read_json(self, map_id: str, name: str) -> Optional[Dict]:
+        """returns the stored JSON object (compressed or, for maps stored by older versions, uncompressed) or None"""
+        path = os.path.join(self.get_path(map_id), name)
+
+        try:
+            with gzip.open(f"{path}.json.gz", "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+
+        try:
+            with open(f"{path}.json", "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_bytes(self, map_id: str, name: str, data: bytes) -> str:
+        """stores the given bytes as file of the map and returns its path"""
+        os.makedirs(self.get_path(map_id), exist_ok=True)
+        path = os.path.join(self.get_path(map_id), name)
+
+        with open(path, "wb") as f:
+            f.write(data)
+
+        self._record(map_id, len(data))
+        return path
+
+    def record_file(self, map_id: str, path: str):
+        """adds a file, which was written into the directory of the map by someone else, to the index"""
+        self._record(map_id, os.path.getsize(path))
+
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def evict(self) -> int:
+        """removes all maps exceeding the retention time and the oldest maps exceeding the size limit. Returns the
+        number of removed maps."""
+        now = time.time()
+        evicted = []
+
+        with self._lock:
+            remaining_bytes = self._total_bytes
+
+            for map_id, (created, size) in self._maps.items():
+                expired = self.ttl_seconds and created < now - self.ttl_seconds
+                too_large = self.max_bytes and remaining_bytes > self.max_bytes
+
+                if not (expired or too_large):
+                    break
+
+                evicted.append((map_id, size))
+                remaining_bytes -= size
+
+            for map_id, size in evicted:
+                del self._maps[map_id]
+                self._total_bytes -= size
+                self._append_journal({"del": map_id})
+
+            if self._journal_lines > 2 * len(self._maps) + 1000:
+                self._compact_journal()
+
+        # directories are removed outside the lock, they aren't referenced by the index anymore
+        for map_id, _ in evicted:
+            shutil.rmtree(self.get_path(map_id), ignore_errors=True)
+
+        return len(evicted)
+
+    def start_eviction(self, interval_seconds: float):
+        """evicts maps periodically within a background thread"""
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+
+                try:
+                    self.evict()
+                except Exception:
+                    logger.exception("Eviction of stored concept maps failed")
+
+        with self._lock:
+            if self._evictor is None:
+                self._evictor = Thread(target=run, name="output-store-eviction", daemon=True)
+                self._evictor.start()
+
+    def _record(self, map_id: str, size: int):
+        with self._lock:
+            if map_id not in self._maps:
+                self._maps[map_id] = [time.time(), 0]
+
+            self._maps[map_id][1] += size
+            self._total_bytes += size
+            self._append_journal({"add": map_id, "t": round(self._maps[map_id][0], 3), "b": size})
+
+    def _append_journal(self, entry: Dict):
+        with open(os.path.join(self.root, JOURNAL_NAME), "a") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+        self._journal_lines += 1
+
+    def _load_journal(self):
+        """restores the index by replaying the journal"""
+        path = os.path.join(self.root, JOURNAL_NAME)
+
+        if not os.path.exists(path):
+            return
+
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # line of an interrupted write
+                    continue
+
+                self._journal_lines += 1
+
+                if "add" in entry:
+                    self._maps.setdefault(entry["add"], [entry["t"], 0])[1] += entry["b"]
+                    self._total_bytes += entry["b"]
+                elif entry.get("del") in self._maps:
+                    self._total_bytes -= self._maps.pop(entry["del"])[1]
+
+    def _compact_journal(self):
+        """rewrites the journal with a single line per stored map"""
+        path = os.path.join(self.root, JOURNAL_NAME)
+
+        with open(path + ".tmp", "w") as f:
+            for map_id, (created, size) in self._maps.items():
+                f.write(json.dumps({"add": map_id, "t": round(created, 3), "b": size}, separators=(",", ":")) + "\n")
+
+        os.replace(path + ".tmp", path)
+        self._journal_lines = len(self._maps)
+
+
+_output_store = None
+_output_store_lock = Lock()
+
+
+def get_output_store() -> OutputStore:
+    """returns the process-wide output store within CM_OUT_DIR. Retention is configured by the environment variables
+    CM_RETENTION_HOURS (default: 168, 0 keeps maps forever), CM_OUT_MAX_MB (default: 2048, 0 for no limit) and
+    CM_EVICTION_INTERVAL_S (default: 300)."""
+    global _output_store
+
+    with _output_store_lock:
+        if _output_store is None:
+            _output_store = OutputStore(
+                root=os.getenv("CM_OUT_DIR"),
+                ttl_seconds=float(os.getenv("CM_RETENTION_HOURS") or 168) * 3600,
+                max_bytes=int(float(os.getenv("CM_OUT_MAX_MB") or 2048) * 2 ** 20)
+            )
+            _output_store.start_eviction(float(os.getenv("CM_EVICTION_INTERVAL_S") or 300))
+
+    return _output_store
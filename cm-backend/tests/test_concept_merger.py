@@ -0,0 +1,46 @@
+import pytest
+
+from merge.concept_merger import deduplicate_scheme, find_duplicates
+
+
+@pytest.mark.parametrize("names", [
+    ["Photosynthesis", "Photosynthesis rate"],
+    ["Machine learning", "Machine learning model"],
+    ["Machine learning model", "Machine learning"]
+])
+def test_name_extended_by_further_words_is_not_merged(names):
+    assert find_duplicates(names) == [0, 1]
+
+
+@pytest.mark.parametrize("names", [
+    ["Machine learning", "machine-learning"],
+    ["Neural network", "The neural networks"],
+    ["Electromagnetic radiation", "Electromagnetic radiaton"]
+])
+def test_variations_of_a_name_are_merged(names):
+    assert find_duplicates(names) == [0, 0]
+
+
+def test_names_with_different_numbers_are_not_merged():
+    assert find_duplicates(["World War 1", "World War 2"]) == [0, 1]
+
+
+def test_deduplicate_scheme_rewrites_relations():
+    scheme = {
+        "concepts": [
+            {"concept_id": "c0", "type": "concept", "properties": {"name": "Neural network"}},
+            {"concept_id": "c1", "type": "concept", "properties": {"name": "Backpropagation"}},
+            {"concept_id": "c2", "type": "concept", "properties": {"name": "Neural networks"}}
+        ],
+        "relations": [
+            {"from_concept": "c1", "to_concept": "c0", "predicate": "trains", "properties": {}},
+            {"from_concept": "c1", "to_concept": "c2", "predicate": "trains", "properties": {}},
+            {"from_concept": "c0", "to_concept": "c2", "predicate": "is", "properties": {}}
+        ]
+    }
+
+    merged, id_map = deduplicate_scheme(scheme)
+
+    assert id_map == {"c2": "c0"}
+    assert [concept["concept_id"] for concept in merged["concepts"]] == ["c0", "c1"]
+    assert [(relation["from_concept"], relation["to_concept"]) for relation in merged["relations"]] == [("c1", "c0")]
@@ -0,0 +1,59 @@
+from pipeline.incremental import merge_scheme
+
+
+def create_concept(concept_id: str, name: str) -> dict:
+    return {"concept_id": concept_id, "type": "concept", "properties": {"name": name}}
+
+
+def create_relation(from_concept: str, to_concept: str, predicate: str) -> dict:
+    return {"from_concept": from_concept, "to_concept": to_concept, "predicate": predicate, "properties": {}}
+
+
+SCHEME = {
+    "concepts": [create_concept("c0", "Photosynthesis"), create_concept("c1", "Light")],
+    "relations": [create_relation("c0", "c1", "requires")]
+}
+
+
+def test_colliding_id_with_different_name_gets_new_id():
+    addition = {
+        "concepts": [create_concept("c0", "Mitochondria"), create_concept("c2", "ATP")],
+        "relations": [create_relation("c0", "c2", "produces")]
+    }
+
+    scheme, contribution = merge_scheme(SCHEME, addition, ["Mitochondria produce ATP."])
+    names = {concept["concept_id"]: concept["properties"]["name"] for concept in scheme["concepts"]}
+
+    assert names["c0"] == "Photosynthesis"
+    assert "Mitochondria" in names.values()
+
+    mitochondria_id = next(concept_id for concept_id, name in names.items() if name == "Mitochondria")
+    assert mitochondria_id != "c0"
+    assert create_relation(mitochondria_id, "c2", "produces") in scheme["relations"]
+    assert create_relation("c0", "c2", "produces") not in scheme["relations"]
+    assert sorted(contribution["concepts"]) == sorted([mitochondria_id, "c2"])
+
+
+def test_colliding_id_with_same_name_is_merged():
+    addition = {
+        "concepts": [create_concept("c0", "photosynthesis"), create_concept("c2", "Chlorophyll")],
+        "relations": [create_relation("c2", "c0", "enables")]
+    }
+
+    scheme, contribution = merge_scheme(SCHEME, addition, ["Chlorophyll enables photosynthesis."])
+
+    assert [concept["concept_id"] for concept in scheme["concepts"]] == ["c0", "c1", "c2"]
+    assert create_relation("c2", "c0", "enables") in scheme["relations"]
+    assert contribution["concepts"] == ["c2"]
+
+
+def test_added_concept_named_like_existing_one_is_mapped():
+    addition = {
+        "concepts": [create_concept("c5", "The Light"), create_concept("c6", "Energy")],
+        "relations": [create_relation("c5", "c6", "carries")]
+    }
+
+    scheme, _ = merge_scheme(SCHEME, addition, ["Light carries energy."])
+
+    assert create_relation("c1", "c6", "carries") in scheme["relations"]
+    assert len(scheme["concepts"]) == 3
@@ -0,0 +1,27 @@
+import pytest
+
+from extract.pdf_text_extractor import PageLimitError, PageRangeError, _select_pages
+
+
+@pytest.mark.parametrize("first_page, last_page", [(0, 0), (-3, -1), (0, 3), (1, 0), (6, 3), (10, None), (6, 8)])
+def test_empty_or_invalid_ranges_are_rejected(first_page, last_page):
+    with pytest.raises(PageRangeError):
+        _select_pages(5, first_page, last_page)
+
+
+def test_empty_pdf_is_rejected():
+    with pytest.raises(PageRangeError):
+        _select_pages(0, 1, None)
+
+
+@pytest.mark.parametrize("first_page, last_page, expected", [(1, None, (0, 5)), (2, 3, (1, 3)), (5, 5, (4, 5)),
+                                                             (3, 9, (2, 5))])
+def test_valid_ranges_are_converted(first_page, last_page, expected):
+    assert _select_pages(5, first_page, last_page) == expected
+
+
+def test_page_limit(monkeypatch):
+    monkeypatch.setenv("CM_PDF_MAX_PAGES", "2")
+
+    with pytest.raises(PageLimitError):
+        _select_pages(5, 1, None)
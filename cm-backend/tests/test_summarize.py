@@ -0,0 +1,27 @@
+from pipeline.summarize import reduce_summaries
+
+
+def create_summary(main_concepts: list, relations: list) -> dict:
+    return {"title": "Title", "summary": "Summary", "importance": "", "focusing_question": "",
+            "main_concepts": main_concepts, "relations": relations}
+
+
+def test_relations_are_matched_by_whole_words():
+    summaries = [
+        create_summary(["AI", "Neural network"], ["Engineers maintain the servers", "AI uses neural networks"]),
+        create_summary(["AI"], ["Companies invest in AI.", "Neural networking events grow"])
+    ]
+
+    summary = reduce_summaries(summaries, 1)
+
+    assert summary["main_concepts"] == ["AI"]
+    assert summary["relations"] == ["AI uses neural networks", "Companies invest in AI."]
+
+
+def test_multi_word_concepts_match_consecutive_words():
+    summaries = [
+        create_summary(["Neural network"], ["A neural network learns weights", "Network effects are neural"]),
+        create_summary(["Neural network"], [])
+    ]
+
+    assert reduce_summaries(summaries, 1)["relations"] == ["A neural network learns weights"]
@@ -1,3 +1,4 @@
+import os
 from datetime import datetime
 
 valid_models = ["gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo",
@@ -13,6 +14,16 @@ def create_timestamp_str():
     return stamp_str
 
 
+def get_env_flag(name, default=False):
+    """returns the boolean value of the given environment variable (true, yes, 1 or on), or the default if unset"""
+    value = os.getenv(name)
+
+    if not value:
+        return default
+
+    return value.strip().lower() in ("true", "yes", "1", "on")
+
+
 def check_if_txt(filename):
     return filename.endswith(".txt") or filename.endswith(".tex") or filename.endswith(".md")
 
@@ -1,5 +1,8 @@
 import graphviz
 
+# special characters of concept names within html-like graphviz-labels (replaced within a single pass)
+_name_translation = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '_': ' '})
+
 
 def get_property_string(value):
     # join list elements
@@ -9,6 +12,12 @@ def get_property_string(value):
     return str(value)
 
 
+def _get_property_rows(properties, skip_name=False):
+    """returns the table rows listing the given properties"""
+    return [f'<TR><TD ALIGN="left">{key}:</TD><TD>{get_property_string(value)}</TD></TR>'
+            for key, value in properties.items() if not (skip_name and key == "name")]
+
+
 def build_graph_from_json(scheme, extension=".pdf", show_labels=True,
                           show_node_props=False, show_edge_props=False) -> graphviz.Digraph:
     dot = graphviz.Digraph(format=extension[1:])
@@ -18,41 +27,33 @@ def build_graph_from_json(scheme, extension=".pdf", show_labels=True,
 
     for concept in concepts:
         # decode some special characters for html-like graphviz-labeling
-        concept_name = (concept['properties']['name'].replace('&', '&amp;')
-                                                     .replace('<', '&lt;')
-                                                     .replace('>', '&gt;')
-                                                     .replace('_', ' '))
-        content = '<<TABLE CELLBORDER="0" BORDER="0">'
+        concept_name = concept['properties']['name'].translate(_name_translation)
+        content = ['<<TABLE CELLBORDER="0" BORDER="0">']
 
         if show_labels:
             # add label of concept to node-content
             concept_type = concept['type'].replace('_', ' ')
-            content += f'<TR><TD COLSPAN="2" CELLPADDING="0" CELLSPACING="0"><I>{concept_type}</I></TD></TR>'
+            content.append(f'<TR><TD COLSPAN="2" CELLPADDING="0" CELLSPACING="0"><I>{concept_type}</I></TD></TR>')
 
         # add name of concept to node-content
-        content += f'<TR><TD COLSPAN="2" CELLPADDING="0" CELLSPACING="0"><B>{concept_name}</B></TD></TR>'
+        content.append(f'<TR><TD COLSPAN="2" CELLPADDING="0" CELLSPACING="0"><B>{concept_name}</B></TD></TR>')
 
         if show_node_props:
             properties = concept['properties']
 
-            if len(properties.keys()) > 1:  # more properties than "name"
-                # add a horizontal rule
-                content += "<HR/>"
-
-                # add additional properties to node content
-                for key in properties.keys():
-                    if key == "name":
-                        continue
+            if len(properties) > 1:  # more properties than "name"
+                # add a horizontal rule and the additional properties to node content
+                content.append("<HR/>")
+                content.extend(_get_property_rows(properties, skip_name=True))
 
-                    content += f'<TR><TD ALIGN="left">{key}:</TD><TD>{get_property_string(properties[key])}</TD></TR>'
-
-        content += '</TABLE>>'
+        content.append('</TABLE>>')
 
         # add concept-node to graph
-        dot.node("co_" + concept['concept_id'], content, fontname="Arial", shape="box")
+        dot.node("co_" + concept['concept_id'], "".join(content), fontname="Arial", shape="box")
 
-    concept_ids = list(map(lambda x: x['concept_id'], concepts))
-    edges = list()
+    concept_ids = {concept['concept_id'] for concept in concepts}
+    pred_ids = set()
+    edges = set()
 
     for rel in relations:
         # discard edges mentioning non-existing concepts
@@ -64,45 +65,43 @@ def build_graph_from_json(scheme, extension=".pdf", show_labels=True,
             # pred_id (id of predicate-node) initially only involves source-concept of relation
             pred_id = "pred_" + rel["from_concept"] + "_" + predicate.replace(' ', '_')
 
-            # add predicate to node content
-            content = f'<<TABLE CELLBORDER="0" BORDER="0">'
-            content += f'<TR><TD COLSPAN="2" CELLPADDING="0" CELLSPACING="0"><I>{predicate}</I></TD></TR>'
+            # content of the predicate node starts with the predicate
+            header = ('<<TABLE CELLBORDER="0" BORDER="0">'
+                      f'<TR><TD COLSPAN="2" CELLPADDING="0" CELLSPACING="0"><I>{predicate}</I></TD></TR>')
 
             if show_edge_props:
                 # extend pred_id by target concept of relation (preventing that relations with the same predicate
                 # but different properties are merged)
                 pred_id += "_" + rel["to_concept"]
                 properties = rel['properties']
+                content = [header]
 
-                if len(properties.keys()) >= 1:
-                    # add a horizontal rule
-                    content += "<HR/>"
-
-                    # add additional properties to node content
-                    for key in properties.keys():
-                        content += f'<TR><TD ALIGN="left">{key}:</TD><TD>{get_property_string(properties[key])}</TD></TR>'
+                if len(properties) >= 1:
+                    # add a horizontal rule and the additional properties to node content
+                    content.append("<HR/>")
+                    content.extend(_get_property_rows(properties))
 
-                content += '</TABLE>>'
+                content.append('</TABLE>>')
 
                 # introduce new predicate-node for every relation and use pred_id to identify this relation
-                dot.node(pred_id, content, fontname="Arial", shape="plaintext")
+                dot.node(pred_id, "".join(content), fontname="Arial", shape="plaintext")
                 dot.edge(source, pred_id, arrowhead="none")
                 dot.edge(pred_id, target)
 
             else:
-                content += '</TABLE>>'
-
                 # introduce new predicate-node for every unseen relation (relations with the same predicate and
                 # source-concept are merged)
-                dot.node(pred_id, content, fontname="Arial", shape="plaintext")
+                if pred_id not in pred_ids:
+                    dot.node(pred_id, header + '</TABLE>>', fontname="Arial", shape="plaintext")
+                    pred_ids.add(pred_id)
 
                 if (source, pred_id) not in edges:
                     dot.edge(source, pred_id, arrowhead="none")
-                    edges.append((source, pred_id))
+                    edges.add((source, pred_id))
 
                 if (pred_id, target) not in edges:
                     dot.edge(pred_id, target)
-                    edges.append((pred_id, target))
+                    edges.add((pred_id, target))
 
     # add a disclaimer
     dot.attr(fontname="Arial")
@@ -0,0 +1,147 @@
+import logging
+import os
+import subprocess
+from threading import BoundedSemaphore, Lock
+from typing import Any, Callable, Dict, List, Optional
+
+import graphviz
+
+from visualize.graphviz_builder import build_graph_from_json
+
+logger = logging.getLogger(__name__)
+
+# graphs up to this size (number of concept- and predicate-nodes) are laid out hierarchically by dot, as long as they
+# are not too dense. Larger graphs are laid out by neato and very large graphs by sfdp (both scale far better).
+DOT_MAX_NODES = 150
+DOT_MAX_EDGES_PER_NODE = 2.5
+NEATO_MAX_NODES = 600
+
+# graph attributes of the force-directed layout engines (remove overlapping nodes)
+ENGINE_ATTRIBUTES = {
+    "neato": {"overlap": "prism", "splines": "true", "sep": "+4"},
+    "sfdp": {"overlap": "prism", "splines": "false", "sep": "+4"}
+}
+
+# simpler style used if a render timed out: no labels or properties, no overlap removal and straight edges
+FALLBACK_ENGINE = "sfdp"
+FALLBACK_ATTRIBUTES = {"overlap": "true", "splines": "false"}
+
+_render_slots = None
+_render_slots_lock = Lock()
+
+
+class RenderTimeoutError(Exception):
+    """Raised if a concept map could not be rendered within the render timeout"""
+
+
+def get_render_timeout() -> float:
+    """returns the maximum duration of a single render in seconds (environment variable CM_RENDER_TIMEOUT_S,
+    default: 30)"""
+    return float(os.getenv("CM_RENDER_TIMEOUT_S") or 30)
+
+
+def get_render_slots() -> BoundedSemaphore:
+    """returns the semaphore bounding the number of concurrently running layout processes (environment variable
+    CM_RENDER_WORKERS, default: number of cpus)"""
+    global _render_slots
+
+    with _render_slots_lock:
+        if _render_slots is None:
+            _render_slots = BoundedSemaphore(int(os.getenv("CM_RENDER_WORKERS") or os.cpu_count() or 1))
+
+    return _render_slots
+
+
+def select_engine(scheme: Dict) -> str:
+    """selects the layout engine by the size and the density of the graph of the given scheme"""
+    # every relation adds a predicate-node and two edges
+    num_nodes = len(scheme['concepts']) + len(scheme['relations'])
+    num_edges = 2 * len(scheme['relations'])
+
+    if num_nodes <= DOT_MAX_NODES and num_edges <= DOT_MAX_EDGES_PER_NODE * max(1, num_nodes):
+        return "dot"
+
+    if num_nodes <= NEATO_MAX_NODES:
+        return "neato"
+
+    return "sfdp"
+
+
+def _run_layout(engine: str, args: List[str], source: Optional[bytes] = None) -> bytes:
+    """runs the layout engine with the given arguments (and the given source as input) within its own process, that
+    is killed if it exceeds the render timeout. Returns the output of the process."""
+    timeout = get_render_timeout()
+
+    slots = get_render_slots()
+    if not slots.acquire(timeout=timeout):
+        raise RenderTimeoutError("Too many concept maps are being rendered, try again later!")
+
+    try:
+        return subprocess.run([engine, *args], input=source, check=True, capture_output=True,
+                              timeout=timeout).stdout
+    except FileNotFoundError as err:
+        raise graphviz.ExecutableNotFound([engine]) from err
+    except subprocess.TimeoutExpired as err:
+        raise RenderTimeoutError(f"Rendering the concept map with {engine} took more than {timeout} seconds!") \
+            from err
+    except subprocess.CalledProcessError as err:
+        raise graphviz.CalledProcessError(err.returncode, err.cmd, output=err.stdout, stderr=err.stderr) from err
+    finally:
+        slots.release()
+
+
+def _apply_engine_attributes(dot: graphviz.Digraph, engine: str):
+    # attributes set by the caller take precedence
+    for key, value in ENGINE_ATTRIBUTES.get(engine, {}).items():
+        dot.graph_attr.setdefault(key, value)
+
+
+def render_graph(dot: graphviz.Digraph, output_gv_path: str, engine: str = "dot") -> str:
+    """saves the source of the graph to output_gv_path and renders it with the given layout engine into
+    output_gv_path.<format> (like graphviz.Digraph.render)"""
+    output_path = f"{output_gv_path}.{dot.format}"
+
+    _apply_engine_attributes(dot, engine)
+    dot.save(output_gv_path)
+
+    _run_layout(engine, [f"-T{dot.format}", "-o", output_path, output_gv_path])
+    return output_path
+
+
+def pipe_graph(dot: graphviz.Digraph, engine: str = "dot") -> bytes:
+    """renders the graph with the given layout engine in memory (like graphviz.Digraph.pipe) and returns the rendered
+    bytes"""
+    _apply_engine_attributes(dot, engine)
+
+    return _run_layout(engine, [f"-T{dot.format}"], dot.source.encode("utf-8"))
+
+
+def _render_with_fallback(scheme: Dict, extension: str, show_labels: bool, show_node_props: bool,
+                          show_edge_props: bool, render: Callable[[graphviz.Digraph, str], Any]):
+    """visualizes the given scheme with a layout engine fitting its size using the given render function. Falls back
+    to a simpler style, if the render times out."""
+    engine = select_engine(scheme)
+    dot = build_graph_from_json(scheme, extension, show_labels, show_node_props, show_edge_props)
+
+    try:
+        return render(dot, engine)
+    except RenderTimeoutError as err:
+        logger.warning(f"{err} Falling back to a simpler style.")
+
+    dot = build_graph_from_json(scheme, extension, show_labels=False)
+    dot.graph_attr.update(FALLBACK_ATTRIBUTES)
+
+    return render(dot, FALLBACK_ENGINE)
+
+
+def render_scheme(scheme: Dict, output_gv_path: str, extension: str = ".pdf", show_labels: bool = True,
+                  show_node_props: bool = False, show_edge_props: bool = False) -> str:
+    """visualizes the given scheme into output_gv_path.<format> and returns the path of the rendered file"""
+    return _render_with_fallback(scheme, extension, show_labels, show_node_props, show_edge_props,
+                                 lambda dot, engine: render_graph(dot, output_gv_path, engine))
+
+
+def pipe_scheme(scheme: Dict, extension: str = ".pdf", show_labels: bool = True, show_node_props: bool = False,
+                show_edge_props: bool = False) -> bytes:
+    """visualizes the given scheme in memory and returns the rendered bytes (nothing is written to disk)"""
+    return _render_with_fallback(scheme, extension, show_labels, show_node_props, show_edge_props, pipe_graph)